@@ -0,0 +1,286 @@
+"""
+Benchmark Graph construction, has_cycle and get_registration_plan on
+synthetic catalogs.
+
+Every run times the three phases separately for each catalog shape and
+size, measures the peak memory of a full build-and-plan, and checks every
+plan against the same rules test_registration.py uses. Results can be saved
+as a baseline and later runs compared against it to catch regressions.
+
+Usage:
+    python3 benchmark_registration.py [--sizes 100 1000 10000 100000]
+        [--shapes random chain layers dense] [--storage list|matrix|numpy]
+        [--save-baseline FILE]
+        [--compare FILE] [--tolerance 1.5]
+    python3 benchmark_registration.py --containers 1000000
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+from registration import (
+    AdjacencyList,
+    AdjacencyMatrix,
+    ArrayQueue,
+    ArrayStack,
+    Graph,
+    Queue,
+    Stack,
+    dense_storage,
+    validate_plan,
+)
+
+# dense webs have about n^2 / 4 edges, so they stop growing here
+MAX_DENSE_VERTICES = 2000
+
+
+def random_dag(num_vertices, seed=0, edges_per_vertex=1.5):
+    """Return an edge list of a random DAG, edges always go to larger indices."""
+    rng = random.Random(seed)
+    edges = set()
+    # tiny graphs have fewer forward pairs than that
+    target = min(
+        int(num_vertices * edges_per_vertex), num_vertices * (num_vertices - 1) // 2
+    )
+    while num_vertices > 1 and len(edges) < target:
+        start, finish = sorted(rng.sample(range(num_vertices), 2))
+        edges.add((start, finish))
+    return sorted(edges)
+
+
+def chain(num_vertices, seed=0):
+    """Return the edge list of one long prerequisite chain."""
+    return [(i, i + 1) for i in range(num_vertices - 1)]
+
+
+def layers(num_vertices, seed=0, width=50):
+    """Return an edge list of wide layers, each course needing two from the layer above."""
+    rng = random.Random(seed)
+    edges = []
+    for finish in range(width, num_vertices):
+        above = (finish // width - 1) * width
+        for start in rng.sample(range(above, above + width), 2):
+            edges.append((start, finish))
+    return edges
+
+
+def dense(num_vertices, seed=0, density=0.5):
+    """Return an edge list where about half of all forward pairs are edges."""
+    rng = random.Random(seed)
+    return [
+        (start, finish)
+        for start in range(num_vertices)
+        for finish in range(start + 1, num_vertices)
+        if rng.random() < density
+    ]
+
+
+SHAPES = {"random": random_dag, "chain": chain, "layers": layers, "dense": dense}
+
+# dense_storage falls back to AdjacencyMatrix when NumPy is missing
+STORAGES = {"list": AdjacencyList, "matrix": AdjacencyMatrix, "numpy": dense_storage}
+
+
+def check_plan(num_vertices, edges, labels, plan):
+    """
+    Validate a plan in O(V+E) with validate_plan from registration.py.
+
+    Raises:
+        AssertionError: If a semester is empty or has more than four
+            courses, a course is missing or repeated, or a prerequisite is
+            not taken in an earlier semester than its course.
+    """
+    try:
+        validate_plan(labels[:num_vertices], edges, plan)
+    except ValueError as error:
+        raise AssertionError(str(error)) from error
+
+
+def build(labels, edges, storage="list"):
+    """Build a Graph one add_vertex / add_edge call at a time."""
+    graph = Graph(STORAGES[storage]())
+    for label in labels:
+        graph.add_vertex(label)
+    for start, finish in edges:
+        graph.add_edge(start, finish)
+    return graph
+
+
+def run_case(shape, num_vertices, seed=0, storage="list"):
+    """
+    Benchmark one catalog.
+
+    Returns:
+        A dictionary with the edge count, the seconds taken by each phase,
+        the peak traced memory in bytes and the number of semesters.
+    """
+    edges = SHAPES[shape](num_vertices, seed)
+    labels = [f"C{i}" for i in range(num_vertices)]
+
+    start = time.perf_counter()
+    graph = build(labels, edges, storage)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cyclic = graph.has_cycle()
+    cycle = time.perf_counter() - start
+    assert not cyclic, f"{shape} catalog unexpectedly has a cycle."
+
+    start = time.perf_counter()
+    plan = graph.get_registration_plan()
+    planning = time.perf_counter() - start
+    check_plan(num_vertices, edges, labels, plan)
+    semesters = len(plan)
+
+    # memory is traced in a separate run, tracing slows everything down
+    del graph, plan
+    tracemalloc.start()
+    build(labels, edges, storage).get_registration_plan()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "edges": len(edges),
+        "load": load,
+        "has_cycle": cycle,
+        "plan": planning,
+        "peak_bytes": peak,
+        "semesters": semesters,
+    }
+
+
+def run(shapes, sizes, seed=0, storage="list"):
+    """Benchmark every shape at every size; returns {shape: {size: result}}."""
+    results = {}
+    for shape in shapes:
+        results[shape] = {}
+        for num_vertices in sizes:
+            if shape == "dense" and num_vertices > MAX_DENSE_VERTICES:
+                continue
+            results[shape][str(num_vertices)] = run_case(
+                shape, num_vertices, seed, storage
+            )
+    return results
+
+
+def report(results, out=sys.stdout):
+    """
+    Print one row per catalog. The slope columns estimate the exponent k in
+    time ~ n^k between a size and the previous one, e.g. 1.0 for linear.
+    """
+    phases = ("load", "has_cycle", "plan")
+    header = f"{'shape':8} {'n':>7} {'edges':>9}"
+    for phase in phases:
+        header += f" {phase + ' s':>11} {'k':>5}"
+    out.write(header + f" {'peak MiB':>9}\n")
+    for shape, cases in results.items():
+        previous = None
+        for size, result in cases.items():
+            row = f"{shape:8} {size:>7} {result['edges']:>9}"
+            for phase in phases:
+                slope = ""
+                if previous is not None and previous[1][phase] > 0:
+                    slope = math.log(result[phase] / previous[1][phase]) / math.log(
+                        int(size) / int(previous[0])
+                    )
+                    slope = f"{slope:.2f}"
+                row += f" {result[phase]:>11.4f} {slope:>5}"
+            out.write(row + f" {result['peak_bytes'] / 2**20:>9.1f}\n")
+            previous = (size, result)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of messages for every phase that got slower than the
+    baseline by more than the tolerance factor.
+    """
+    regressions = []
+    for shape, cases in results.items():
+        for size, result in cases.items():
+            before = baseline.get(shape, {}).get(size)
+            if before is None:
+                continue
+            for phase in ("load", "has_cycle", "plan", "peak_bytes"):
+                # ignore noise on phases that take well under a millisecond
+                if before[phase] > 1e-3 and result[phase] > before[phase] * tolerance:
+                    regressions.append(
+                        f"{shape} n={size} {phase}: {before[phase]:.4g} -> "
+                        f"{result[phase]:.4g}"
+                    )
+    return regressions
+
+
+def run_containers(count):
+    """
+    Time count pushes followed by count pops for the linked and the array
+    backed Stack and Queue, then the same with extend and drain.
+
+    Returns:
+        A dictionary of seconds per container and operation.
+    """
+    items = range(count)
+    results = {}
+    for name, container, add, remove in (
+        ("Stack", Stack, "push", "pop"),
+        ("ArrayStack", ArrayStack, "push", "pop"),
+        ("Queue", Queue, "enqueue", "dequeue"),
+        ("ArrayQueue", ArrayQueue, "enqueue", "dequeue"),
+    ):
+        instance = container()
+        put, take = getattr(instance, add), getattr(instance, remove)
+        start = time.perf_counter()
+        for item in items:
+            put(item)
+        for _ in items:
+            take()
+        results[f"{name} {add}/{remove}"] = time.perf_counter() - start
+        if hasattr(instance, "extend"):
+            start = time.perf_counter()
+            instance.extend(items)
+            instance.drain()
+            results[f"{name} extend/drain"] = time.perf_counter() - start
+    return results
+
+
+def main(argv=None):
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000]
+    )
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=STORAGES, default="list")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--compare", metavar="FILE")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--containers", type=int, metavar="N")
+    args = parser.parse_args(argv)
+
+    if args.containers:
+        for name, seconds in run_containers(args.containers).items():
+            print(f"{name:28} {seconds:>9.4f} s")
+        return
+
+    results = run(args.shapes, args.sizes, args.seed, args.storage)
+    report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,70 @@ UT EID 1: cmo2388
 UT EID 2: jan3557
 """
 
+import heapq
+import itertools
+import sys
+import time
+
+# Only builtin or tiny modules are imported up front, so the command line
+# starts fast. Optional subsystems (NumPy, profiling, JSON, hashing and the
+# compiled format) are imported where they are first used.
+
+MAX_COURSES_PER_SEMESTER = 4
+
+_INSTRUMENTATION = None  # the active Instrumentation, if any
+
+
+class Instrumentation:
+    """
+    Opt-in counters and wall-clock timings for Graph operations.
+
+    Instrumented operations check for an active Instrumentation once per
+    call and record one entry when they finish, so their inner loops are
+    the same whether or not it is enabled.
+
+    Instance Variables:
+        counters: Totals such as edges_scanned, vertices_visited,
+            semesters_produced and matrix_copies.
+        timings: Seconds spent per phase.
+        calls: Number of calls per phase.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.timings = {}
+        self.calls = {}
+
+    def record(self, phase, start, **counts):
+        """Add one call of phase that began at perf_counter() time start."""
+        self.timings[phase] = self.timings.get(phase, 0.0) + time.perf_counter() - start
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        for name, value in counts.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        """Return the counters, timings and calls as one dictionary."""
+        return {
+            "counters": dict(self.counters),
+            "timings_seconds": dict(self.timings),
+            "calls": dict(self.calls),
+        }
+
+
+def enable_instrumentation():
+    """Start recording Graph operations into a new Instrumentation and return it."""
+    global _INSTRUMENTATION  # pylint: disable=global-statement
+    _INSTRUMENTATION = Instrumentation()
+    return _INSTRUMENTATION
+
+
+def disable_instrumentation():
+    """Stop recording and return the Instrumentation that was active, if any."""
+    global _INSTRUMENTATION  # pylint: disable=global-statement
+    stats, _INSTRUMENTATION = _INSTRUMENTATION, None
+    return stats
+
+
 class Node:
     """
     Represents a node in a singly linked list.
@@ -24,6 +88,8 @@ class Node:
         next: The reference to the next node in the linked list (None by default).
     """
 
+    __slots__ = ("data", "next")
+
     def __init__(self, data, next=None):
         """
         Initializes a new node with the given data and a reference to the next node.
@@ -182,9 +248,207 @@ class Queue:
         return self._size
 
 
+class ArrayStack:
+    """
+    A stack kept in a Python list, with the API and errors of Stack but
+    without a Node allocation per push.
+
+    Instance Variables:
+        _items: The items, bottom first.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self):
+        """
+        Initializes an empty stack.
+        """
+        self._items = []
+
+    def peek(self):
+        """
+        Returns the item on top of the stack without removing it.
+
+        Raises:
+            StackError: If the stack is empty, raises "Peek from empty stack.".
+        """
+        if not self._items:
+            raise StackError("Peek from empty stack.")
+        return self._items[-1]
+
+    def push(self, item):
+        """
+        Pushes item on top of the stack.
+        """
+        self._items.append(item)
+
+    def pop(self):
+        """
+        Removes and returns the item on top of the stack.
+
+        Raises:
+            StackError: If the stack is empty, raises "Pop from empty stack.".
+        """
+        if not self._items:
+            raise StackError("Pop from empty stack.")
+        return self._items.pop()
+
+    def extend(self, items):
+        """
+        Pushes every item in order, so the last one ends up on top.
+        """
+        self._items.extend(items)
+
+    def drain(self):
+        """
+        Removes every item and returns them as a list in pop order.
+        """
+        items = self._items
+        self._items = []
+        items.reverse()
+        return items
+
+    def is_empty(self):
+        """
+        Checks if the stack is empty.
+        """
+        return not self._items
+
+    def size(self):
+        """
+        Returns the number of items in the stack.
+        """
+        return len(self._items)
+
+
+class ArrayQueue:
+    """
+    A queue kept in a circular buffer, with the API and errors of Queue but
+    without a Node allocation per enqueue. The buffer doubles when it is
+    full and halves when it is a quarter full.
+
+    Instance Variables:
+        _items: The buffer; its length is a power of two.
+        _front: The buffer position of the front item.
+        _size: The number of items in the queue.
+    """
+
+    __slots__ = ("_items", "_front", "_size")
+
+    MIN_CAPACITY = 8
+
+    def __init__(self):
+        """
+        Initializes an empty queue.
+        """
+        self._items = [None] * self.MIN_CAPACITY
+        self._front = 0
+        self._size = 0
+
+    def _resize(self, capacity):
+        """
+        Moves the items to the start of a buffer of the given capacity.
+        """
+        items = self._items
+        end = self._front + self._size
+        if end <= len(items):
+            kept = items[self._front : end]
+        else:
+            kept = items[self._front :] + items[: end - len(items)]
+        self._items = kept + [None] * (capacity - self._size)
+        self._front = 0
+
+    def peek(self):
+        """
+        Returns the item at the front of the queue without removing it.
+
+        Raises:
+            QueueError: If the queue is empty, raises "Peek from empty queue.".
+        """
+        if not self._size:
+            raise QueueError("Peek from empty queue.")
+        return self._items[self._front]
+
+    def enqueue(self, item):
+        """
+        Puts item at the end of the queue.
+        """
+        items = self._items
+        if self._size == len(items):
+            self._resize(2 * len(items))
+            items = self._items
+        items[(self._front + self._size) & (len(items) - 1)] = item
+        self._size += 1
+
+    def dequeue(self):
+        """
+        Removes and returns the item at the front of the queue.
+
+        Raises:
+            QueueError: If the queue is empty, raises "Dequeue from empty queue.".
+        """
+        if not self._size:
+            raise QueueError("Dequeue from empty queue.")
+        items = self._items
+        item = items[self._front]
+        items[self._front] = None  # let the item be freed
+        self._front = (self._front + 1) & (len(items) - 1)
+        self._size -= 1
+        if len(items) > self.MIN_CAPACITY and self._size <= len(items) // 4:
+            self._resize(len(items) // 2)
+        return item
+
+    def extend(self, items):
+        """
+        Puts every item at the end of the queue in order.
+        """
+        items = list(items)
+        capacity = len(self._items)
+        if self._size + len(items) > capacity:
+            while self._size + len(items) > capacity:
+                capacity *= 2
+            self._resize(capacity)
+        buffer = self._items
+        mask = len(buffer) - 1
+        rear = self._front + self._size
+        for offset, item in enumerate(items):
+            buffer[(rear + offset) & mask] = item
+        self._size += len(items)
+
+    def drain(self):
+        """
+        Removes every item and returns them as a list in dequeue order.
+        """
+        self._resize(self._size)
+        items = self._items
+        self._items = [None] * self.MIN_CAPACITY
+        self._size = 0
+        return items
+
+    def is_empty(self):
+        """
+        Checks if the queue is empty.
+        """
+        return self._size == 0
+
+    def size(self):
+        """
+        Returns the number of items in the queue.
+        """
+        return self._size
+
+
+class CycleError(Exception):
+    """
+    Raised when a registration plan is requested for a graph with a cycle.
+    """
+
+
 class Vertex:
     """Vertex Class using properties and setters for better encapsulation."""
 
+    __slots__ = ("__label", "__visited")
+
     def __init__(self, label):
         self.__label = label
         self.visited = False
@@ -197,7 +461,8 @@ class Vertex:
     @visited.setter
     def visited(self, value):
         """Setter to set the visited status of the vertex."""
-        if isinstance(value, bool):
+        # bool cannot be subclassed, so this is isinstance(value, bool)
+        if value is True or value is False:
             self.__visited = value
         else:
             raise ValueError("Visited status must be a boolean value.")
@@ -212,163 +477,2390 @@ class Vertex:
         return str(self.__label)
 
 
-class Graph:
-    """A Class to present Graph."""
+class VertexView:
+    """
+    A Vertex-like handle on one entry of a VertexArray.
+
+    Instance Variables:
+        _array: The VertexArray holding the data.
+        _index: The index of the vertex in the array.
+    """
+
+    __slots__ = ("_array", "_index")
+
+    def __init__(self, array, index):
+        self._array = array
+        self._index = index
+
+    @property
+    def visited(self):
+        """Property to get the visited status of the vertex."""
+        return self._array.visited[self._index] == 1
+
+    @visited.setter
+    def visited(self, value):
+        """Setter to set the visited status of the vertex."""
+        if value is True or value is False:
+            self._array.visited[self._index] = value
+        else:
+            raise ValueError("Visited status must be a boolean value.")
+
+    @property
+    def label(self):
+        """Property to get the label of the vertex."""
+        return self._array.labels[self._index]
+
+    def __str__(self):
+        """String representation of the vertex"""
+        return str(self.label)
+
+
+class AdjacencyMatrixView:
+    """
+    A read-only, matrix-shaped view of the edges of a Graph, so
+    view[i][j] is 1 if there is an edge i -> j and 0 otherwise. Entries
+    are looked up in the edge storage on access, so nothing is copied and
+    the view always shows the current edges.
+
+    Instance Variables:
+        _graph: The Graph whose edges are shown.
+    """
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __len__(self):
+        """Return the number of rows, which is the number of vertices."""
+        return len(self._graph.vertices)
+
+    def __getitem__(self, row):
+        """Return a read-only view of one row."""
+        num_vertices = len(self._graph.vertices)
+        if row < 0:
+            row += num_vertices
+        if not 0 <= row < num_vertices:
+            raise IndexError("Adjacency matrix row out of range.")
+        return AdjacencyRowView(self._graph, row)
+
+    def __iter__(self):
+        """Iterate over the rows."""
+        for row in range(len(self)):
+            yield AdjacencyRowView(self._graph, row)
+
+    def tolist(self):
+        """Return a new list of lists with the same entries."""
+        stats = _INSTRUMENTATION
+        start = time.perf_counter() if stats is not None else 0.0
+        storage = self._graph.storage
+        matrix = storage.to_matrix()
+        if isinstance(storage, AdjacencyMatrix):
+            # that one hands out the matrix it keeps
+            matrix = [row[:] for row in matrix]
+        if stats is not None:
+            stats.record("adjacency_matrix", start, matrix_copies=1)
+        return matrix
+
+    def __eq__(self, other):
+        """Compare entries with another view or a list of rows."""
+        try:
+            return self.tolist() == [list(row) for row in other]
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+
+class AdjacencyRowView:
+    """
+    A read-only view of one row of an AdjacencyMatrixView.
+
+    Instance Variables:
+        _graph: The Graph whose edges are shown.
+        _row: The index of the vertex the row belongs to.
+    """
+
+    __slots__ = ("_graph", "_row")
+
+    def __init__(self, graph, row):
+        self._graph = graph
+        self._row = row
+
+    def __len__(self):
+        """Return the number of columns, which is the number of vertices."""
+        return len(self._graph.vertices)
+
+    def __getitem__(self, column):
+        """Return 1 if there is an edge from this row's vertex to column, else 0."""
+        num_vertices = len(self._graph.vertices)
+        if column < 0:
+            column += num_vertices
+        if not 0 <= column < num_vertices:
+            raise IndexError("Adjacency matrix column out of range.")
+        return int(self._graph.storage.has_edge(self._row, column))
+
+    def __iter__(self):
+        """Iterate over the entries of the row."""
+        entries = [0] * len(self)
+        for column in self._graph.storage.get_successors(self._row):
+            entries[column] = 1
+        return iter(entries)
+
+    def __eq__(self, other):
+        """Compare entries with another row view or a list."""
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+
+class VertexArray:
+    """
+    Struct-of-arrays storage for vertices: labels live in one list and
+    visited flags in one bytearray, instead of one Vertex object each.
+    Indexing returns a VertexView, so it can stand in for a list of Vertex.
+
+    Instance Variables:
+        labels: The vertex labels, by index.
+        visited: The visited flags (0 or 1), by index.
+    """
+
+    __slots__ = ("labels", "visited")
+
+    def __init__(self):
+        self.labels = []
+        self.visited = bytearray()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.labels)
+        if not 0 <= index < len(self.labels):
+            raise IndexError("VertexArray index out of range")
+        return VertexView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.labels)):
+            yield VertexView(self, index)
+
+    def add(self, label):
+        """Append an unvisited vertex with the given label."""
+        self.labels.append(label)
+        self.visited.append(0)
+
+    def append(self, vertex):
+        """Append a copy of a Vertex."""
+        self.labels.append(vertex.label)
+        self.visited.append(vertex.visited)
+
+    def pop(self, index=-1):
+        """Remove the vertex at index and return it as a Vertex."""
+        vertex = Vertex(self.labels.pop(index))
+        vertex.visited = self.visited.pop(index) == 1
+        return vertex
+
+    def reset_visited(self):
+        """Mark every vertex as not visited."""
+        self.visited[:] = bytes(len(self.visited))
+
+
+class AdjacencyList:
+    """
+    Sparse edge storage using forward and reverse adjacency lists.
+
+    Instance Variables:
+        successors: successors[i] is the set of vertex indices i points to.
+        predecessors: predecessors[i] is the set of vertex indices pointing to i.
+    """
+
+    vectorized = False
+
+    def __init__(self):
+        self.successors = []
+        self.predecessors = []
+
+    def add_vertex(self):
+        """Make room for one more vertex."""
+        self.successors.append(set())
+        self.predecessors.append(set())
+
+    def add_edge(self, start, finish):
+        """Store the directed edge start -> finish."""
+        self.successors[start].add(finish)
+        self.predecessors[finish].add(start)
+
+    def remove_edge(self, start, finish):
+        """Forget the directed edge start -> finish, if stored."""
+        self.successors[start].discard(finish)
+        self.predecessors[finish].discard(start)
+
+    def remove_vertex(self, index):
+        """Drop a vertex and its edges; later indices shift down by one."""
+        self.successors.pop(index)
+        self.predecessors.pop(index)
+        for adjacency in (self.successors, self.predecessors):
+            for k, ends in enumerate(adjacency):
+                if ends and max(ends) >= index:
+                    adjacency[k] = {j - (j > index) for j in ends if j != index}
+
+    def has_edge(self, start, finish):
+        """Return True if the edge start -> finish is stored."""
+        return finish in self.successors[start]
+
+    def get_successors(self, index):
+        """Return an iterable of the indices that index points to."""
+        return self.successors[index]
+
+    def get_predecessors(self, index):
+        """Return an iterable of the indices that point to index."""
+        return self.predecessors[index]
+
+    def in_degree(self, index):
+        """Return the number of edges ending at index."""
+        return len(self.predecessors[index])
+
+    def in_degrees(self):
+        """Return the in-degree of every vertex as a list."""
+        return [len(starts) for starts in self.predecessors]
+
+    def to_matrix(self):
+        """Return the edges as a freshly built dense adjacency matrix."""
+        num_vertices = len(self.successors)
+        matrix = [[0] * num_vertices for _ in range(num_vertices)]
+        for start, finishes in enumerate(self.successors):
+            row = matrix[start]
+            for finish in finishes:
+                row[finish] = 1
+        return matrix
+
+
+class AdjacencyMatrix:
+    """
+    Dense edge storage using an adjacency matrix. Cheap for small graphs,
+    but every vertex costs a full row and column.
+
+    Instance Variables:
+        matrix: matrix[i][j] is 1 if there is an edge i -> j, else 0.
+    """
+
+    vectorized = False
+
+    def __init__(self):
+        self.matrix = []
+
+    def add_vertex(self):
+        """Make room for one more vertex."""
+        # add a new column in the adjacency matrix
+        for row in self.matrix:
+            row.append(0)
+
+        # add a new row for the new vertex
+        self.matrix.append([0] * (len(self.matrix) + 1))
+
+    def add_edge(self, start, finish):
+        """Store the directed edge start -> finish."""
+        self.matrix[start][finish] = 1
+
+    def remove_edge(self, start, finish):
+        """Forget the directed edge start -> finish, if stored."""
+        self.matrix[start][finish] = 0
+
+    def remove_vertex(self, index):
+        """Drop a vertex and its edges; later indices shift down by one."""
+        self.matrix.pop(index)
+        for row in self.matrix:
+            row.pop(index)
+
+    def has_edge(self, start, finish):
+        """Return True if the edge start -> finish is stored."""
+        return self.matrix[start][finish] == 1
+
+    def get_successors(self, index):
+        """Return an iterable of the indices that index points to."""
+        return [j for j, edge in enumerate(self.matrix[index]) if edge]
+
+    def get_predecessors(self, index):
+        """Return an iterable of the indices that point to index."""
+        return [i for i, row in enumerate(self.matrix) if row[index]]
+
+    def in_degree(self, index):
+        """Return the number of edges ending at index."""
+        return sum(row[index] for row in self.matrix)
+
+    def in_degrees(self):
+        """Return the in-degree of every vertex as a list."""
+        return [sum(column) for column in zip(*self.matrix)]
+
+    def to_matrix(self):
+        """Return the underlying adjacency matrix."""
+        return self.matrix
+
+
+_NUMPY = []  # holds the numpy module, or None, once we tried importing it
+
+
+def _import_numpy():
+    """Import numpy on first use; returns None if it is not installed."""
+    if not _NUMPY:
+        try:
+            import numpy  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            numpy = None
+        _NUMPY.append(numpy)
+    return _NUMPY[0]
+
+
+class NumpyAdjacencyMatrix:
+    """
+    Dense edge storage in a NumPy uint8 matrix, for graphs where most
+    courses are related. Planning and cycle checks work on whole rows and
+    columns at once instead of looping in Python.
+
+    Instance Variables:
+        array: A square uint8 array whose top-left num_vertices block holds
+            the edges; it grows by doubling so add_vertex is amortized O(N).
+        num_vertices: The number of vertices stored.
+    """
+
+    vectorized = True
 
     def __init__(self):
-        self.vertices = []  # a list of vertex objects
-        self.adjacency_matrix = []  # adjacency matrix of edges
+        numpy = _import_numpy()
+        if numpy is None:
+            raise ImportError("NumpyAdjacencyMatrix requires numpy.")
+        self._np = numpy
+        self.array = numpy.zeros((0, 0), dtype=numpy.uint8)
+        self.num_vertices = 0
+
+    @property
+    def matrix(self):
+        """A view of the edges between the stored vertices."""
+        return self.array[: self.num_vertices, : self.num_vertices]
+
+    def add_vertex(self):
+        """Make room for one more vertex."""
+        if self.num_vertices == len(self.array):
+            capacity = max(8, 2 * len(self.array))
+            grown = self._np.zeros((capacity, capacity), dtype=self._np.uint8)
+            grown[: self.num_vertices, : self.num_vertices] = self.matrix
+            self.array = grown
+        self.num_vertices += 1
+
+    def add_edge(self, start, finish):
+        """Store the directed edge start -> finish."""
+        # index the view, not the array, so indices past the stored
+        # vertices raise IndexError instead of landing in the spare rows
+        self.matrix[start, finish] = 1
+
+    def remove_edge(self, start, finish):
+        """Forget the directed edge start -> finish, if stored."""
+        self.matrix[start, finish] = 0
+
+    def remove_vertex(self, index):
+        """Drop a vertex and its edges; later indices shift down by one."""
+        np = self._np
+        last = self.num_vertices - 1
+        kept = np.delete(np.delete(self.matrix, index, axis=0), index, axis=1)
+        self.array[:last, :last] = kept
+        self.array[last, :] = 0
+        self.array[:, last] = 0
+        self.num_vertices = last
+
+    def has_edge(self, start, finish):
+        """Return True if the edge start -> finish is stored."""
+        return self.matrix[start, finish] == 1
+
+    def get_successors(self, index):
+        """Return a list of the indices that index points to."""
+        return self._np.flatnonzero(self.matrix[index]).tolist()
+
+    def get_predecessors(self, index):
+        """Return a list of the indices that point to index."""
+        return self._np.flatnonzero(self.matrix[:, index]).tolist()
+
+    def in_degree(self, index):
+        """Return the number of edges ending at index."""
+        return int(self.matrix[:, index].sum())
+
+    def in_degrees(self):
+        """Return the in-degree of every vertex as a list."""
+        return self.matrix.sum(axis=0, dtype=self._np.int64).tolist()
+
+    def to_matrix(self):
+        """Return the edges as a nested list adjacency matrix."""
+        return self.matrix.tolist()
+
+    def topological_order(self):
+        """
+        Peel off every course without remaining prerequisites at once until
+        nothing is left; returns the peeled order, or None if a cycle stops
+        the peeling.
+        """
+        np = self._np
+        matrix = self.matrix
+        in_degree = matrix.sum(axis=0, dtype=np.int64)
+        remaining = np.ones(self.num_vertices, dtype=bool)
+        order = []
+        while True:
+            peeled = np.flatnonzero(remaining & (in_degree == 0))
+            if not peeled.size:
+                break
+            order.extend(peeled.tolist())
+            remaining[peeled] = False
+            in_degree -= matrix[peeled].sum(axis=0, dtype=np.int64)
+        if remaining.any():
+            return None
+        return order
+
+    def plan_semesters(self, cap):
+        """
+        Plan semesters of at most cap courses, taking the ready courses with
+        the smallest indices first, like Graph.try_registration_plan does
+        without a priority. Taken courses are masked out instead of removed.
+
+        post: returns a list of semesters of vertex indices, or None if the
+        prerequisites form a cycle.
+        """
+        np = self._np
+        matrix = self.matrix
+        in_degree = matrix.sum(axis=0, dtype=np.int64)
+        remaining = np.ones(self.num_vertices, dtype=bool)
+        semesters = []
+        for _ in range(self.num_vertices):
+            ready = np.flatnonzero(remaining & (in_degree == 0))
+            if not ready.size:
+                break
+            semester = ready[:cap]
+            semesters.append(semester.tolist())
+            remaining[semester] = False
+            in_degree -= matrix[semester].sum(axis=0, dtype=np.int64)
+        if remaining.any():
+            return None
+        return semesters
+
+
+def dense_storage():
+    """
+    Return empty dense edge storage: a NumpyAdjacencyMatrix when NumPy is
+    installed, otherwise the pure-Python AdjacencyMatrix.
+    """
+    if _import_numpy() is None:
+        return AdjacencyMatrix()
+    return NumpyAdjacencyMatrix()
+
+
+# a compiled catalog starts with magic, num_vertices, num_edges, label_bytes
+COMPILED_MAGIC = b"REGCAT1\0"
+COMPILED_HEADER = "<8sIII"
+
+
+class CSRStorage:
+    """
+    Read-only edge storage over the compressed sparse rows of a compiled
+    catalog (see registration_compiled.py for the file layout). The arrays
+    are memoryviews into the mapped file.
+
+    Instance Variables:
+        offsets, targets: Successors of i are targets[offsets[i]:offsets[i + 1]].
+        pred_offsets, sources: The same for predecessors.
+        in_degree_array: The in-degree of every vertex.
+    """
+
+    vectorized = False
+
+    def __init__(self, buffer, num_vertices, num_edges, start):
+        self._buffer = buffer
+        self._views = []
+        sizes = (num_vertices + 1, num_edges, num_vertices, num_vertices + 1, num_edges)
+        arrays = []
+        for size in sizes:
+            arrays.append(self._uint32_view(start, size))
+            start += 4 * size
+        (
+            self.offsets,
+            self.targets,
+            self.in_degree_array,
+            self.pred_offsets,
+            self.sources,
+        ) = arrays
+
+    def _uint32_view(self, start, size):
+        """Return size uint32 values at byte offset start, zero-copy if possible."""
+        from array import array  # pylint: disable=import-outside-toplevel
+
+        raw = memoryview(self._buffer)[start : start + 4 * size]
+        self._views.append(raw)
+        if sys.byteorder == "little" and array("I").itemsize == 4:
+            view = raw.cast("I")
+            self._views.append(view)
+            return view
+        values = array("I")
+        values.frombytes(raw)
+        values.byteswap()
+        return values
+
+    def _read_only(self, *args):
+        """Reject every edit."""
+        raise TypeError("A compiled catalog is read-only.")
+
+    add_vertex = add_edge = remove_edge = remove_vertex = _read_only
+
+    def has_edge(self, start, finish):
+        """Return True if the edge start -> finish is stored."""
+        return finish in self.get_successors(start)
+
+    def get_successors(self, index):
+        """Return a sequence of the indices that index points to."""
+        return self.targets[self.offsets[index] : self.offsets[index + 1]]
+
+    def get_predecessors(self, index):
+        """Return a sequence of the indices that point to index."""
+        return self.sources[self.pred_offsets[index] : self.pred_offsets[index + 1]]
+
+    def in_degree(self, index):
+        """Return the number of edges ending at index."""
+        return self.in_degree_array[index]
+
+    def in_degrees(self):
+        """Return the in-degree of every vertex as a list."""
+        return self.in_degree_array.tolist()
+
+    def to_matrix(self):
+        """Return the edges as a freshly built dense adjacency matrix."""
+        num_vertices = len(self.in_degree_array)
+        matrix = [[0] * num_vertices for _ in range(num_vertices)]
+        for start in range(num_vertices):
+            for finish in self.get_successors(start):
+                matrix[start][finish] = 1
+        return matrix
+
+    def close(self):
+        """Release the views and unmap the file."""
+        import mmap  # pylint: disable=import-outside-toplevel
+
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+class PlanConstraints:
+    """
+    What a semester can hold, for planners that go beyond four courses per
+    semester.
+
+    Instance Variables:
+        capacity: The most total weight one semester can hold, either as a
+            number or as a function from semester number (0 first) to a
+            number.
+        weights: Maps a course label to its weight, e.g. its credit hours.
+            Courses not listed weigh 1.
+        offerings: Maps a course label to the term names it is offered in.
+            Courses not listed are offered every term.
+        terms: The term names semesters cycle through, starting with the
+            first semester.
+    """
+
+    def __init__(
+        self,
+        capacity=MAX_COURSES_PER_SEMESTER,
+        weights=None,
+        offerings=None,
+        terms=("fall", "spring"),
+    ):
+        if not terms:
+            raise ValueError("PlanConstraints needs at least one term.")
+        self.capacity = capacity
+        self.weights = weights or {}
+        self.offerings = offerings or {}
+        self.terms = tuple(terms)
+
+    def capacity_of(self, semester):
+        """Return the weight semester number semester can hold."""
+        if callable(self.capacity):
+            return self.capacity(semester)
+        return self.capacity
+
+    def term_of(self, semester):
+        """Return the term name of semester number semester."""
+        return self.terms[semester % len(self.terms)]
+
+
+class ReachabilityIndex:
+    """
+    Answers "is A a prerequisite of B, directly or indirectly" and "what are
+    all the prerequisites of B" for one state of a Graph.
+
+    Acyclic graphs with at most closure_limit vertices get their whole
+    transitive closure up front, as one integer bitset of ancestors and one
+    of descendants per vertex. Larger or cyclic graphs are searched per
+    query, and the last cache_size answers are kept in an LRU cache.
+    """
+
+    def __init__(self, graph, closure_limit=5000, cache_size=1024):
+        self.storage = graph.storage
+        self.num_vertices = len(graph.vertices)
+        self.cache_size = cache_size
+        self._cache = {}  # (forward, index) -> bitset, least recent first
+        self.hits = 0
+        self.misses = 0
+        self._descendants = None
+        self._ancestors = None
+        if self.num_vertices <= closure_limit:
+            order = graph.topological_order()
+            if order is not None:
+                self._build_closure(order)
+
+    def _build_closure(self, order):
+        """Fill both bitset tables, walking the topological order each way."""
+        storage = self.storage
+        descendants = [0] * self.num_vertices
+        for i in reversed(order):
+            bits = 0
+            for j in storage.get_successors(i):
+                bits |= descendants[j] | (1 << j)
+            descendants[i] = bits
+        ancestors = [0] * self.num_vertices
+        for i in order:
+            bits = 0
+            for j in storage.get_predecessors(i):
+                bits |= ancestors[j] | (1 << j)
+            ancestors[i] = bits
+        self._descendants = descendants
+        self._ancestors = ancestors
+
+    def _search(self, index, forward):
+        """Return the bitset of vertices reachable from index in one direction."""
+        key = (forward, index)
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            cache[key] = bits = cache.pop(key)
+            return bits
+        self.misses += 1
+
+        if forward:
+            neighbors = self.storage.get_successors
+        else:
+            neighbors = self.storage.get_predecessors
+        seen = bytearray(self.num_vertices)
+        found = [index]
+        bits = 0
+        for i in found:  # found grows while we walk it
+            for j in neighbors(i):
+                if not seen[j]:
+                    seen[j] = 1
+                    bits |= 1 << j
+                    found.append(j)
+
+        cache[key] = bits
+        if len(cache) > self.cache_size:
+            del cache[next(iter(cache))]
+        return bits
+
+    def descendant_bits(self, index):
+        """Return a bitset of every vertex that index is a prerequisite of."""
+        if self._descendants is not None:
+            return self._descendants[index]
+        return self._search(index, True)
+
+    def ancestor_bits(self, index):
+        """Return a bitset of every prerequisite of index, direct or indirect."""
+        if self._ancestors is not None:
+            return self._ancestors[index]
+        return self._search(index, False)
+
+    def reaches(self, start, finish):
+        """Return True if there is a path of one or more edges start -> finish."""
+        return self.descendant_bits(start) >> finish & 1 == 1
+
+    @staticmethod
+    def indices(bits):
+        """Return the vertex indices in a bitset, smallest first."""
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(low.bit_length() - 1)
+            bits ^= low
+        return result
+
+
+class PlanCache:
+    """
+    Remembers the default plan (or the cycle verdict) of graphs by the
+    structure-only fingerprint of their edges between vertex indices, so a
+    repeated graph is answered without planning it again. The key is not a
+    canonical form of the graph.
+
+    Plans are stored as semesters of vertex indices and relabeled for each
+    graph, so graphs that only differ in their labels share one entry as
+    long as their vertices come in the same order. Isomorphic graphs whose
+    vertices are ordered differently get separate entries: the default plan
+    breaks ties by vertex order, so their plans can differ anyway. The
+    last maxsize entries are kept in memory in an LRU order; with a path,
+    every entry is also written to a JSON file in that directory, where
+    later processes can find it.
+
+    Instance Variables:
+        hits: Lookups answered from memory.
+        disk_hits: Lookups answered from the directory.
+        misses: Lookups that had to plan the graph.
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self._plans = {}  # fingerprint -> index plan or None, least recent first
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _file(self, key):
+        """Return the path of the file for a fingerprint."""
+        import os  # pylint: disable=import-outside-toplevel
+
+        return os.path.join(self.path, key + ".json")
+
+    def _load(self, key):
+        """Return (True, plan) from the directory, or (False, None)."""
+        import json  # pylint: disable=import-outside-toplevel
+
+        try:
+            with open(self._file(key), encoding="utf-8") as file:
+                return True, json.load(file)["plan"]
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+    def _save(self, key, plan):
+        """Write an entry to the directory; other processes may read it at once."""
+        # pylint: disable=import-outside-toplevel
+        import json
+        import os
+
+        os.makedirs(self.path, exist_ok=True)
+        temporary = f"{self._file(key)}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"plan": plan}, file)
+        os.replace(temporary, self._file(key))
+
+    def _remember(self, key, plan):
+        """Add an entry to memory, dropping the least recently used."""
+        self._plans[key] = plan
+        if len(self._plans) > self.maxsize:
+            del self._plans[next(iter(self._plans))]
+
+    def get_plan(self, graph):
+        """
+        Return graph.try_registration_plan(), from the cache when a graph
+        with the same edges between the same vertex indices has been planned
+        before.
+        """
+        key = graph.fingerprint(structure_only=True)
+        if key in self._plans:
+            self.hits += 1
+            self._plans[key] = plan = self._plans.pop(key)
+        else:
+            found, plan = self._load(key) if self.path is not None else (False, None)
+            if found:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                courses = graph.try_registration_plan()
+                if courses is not None:
+                    index = graph.index
+                    plan = [[index[label] for label in semester] for semester in courses]
+                if self.path is not None:
+                    self._save(key, plan)
+            self._remember(key, plan)
+
+        if plan is None:
+            return None
+        labels = graph.labels
+        return [[labels[i] for i in semester] for semester in plan]
+
+    def has_cycle(self, graph):
+        """Return graph.has_cycle(), from the cache when possible."""
+        return self.get_plan(graph) is None
+
+    def stats(self):
+        """Return the hit and miss counts as a dictionary."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._plans),
+        }
+
+
+class Graph:
+    """
+    A Class to present Graph.
+
+    Edges live in a pluggable storage object. The default is a sparse
+    AdjacencyList; pass storage=AdjacencyMatrix() for the dense layout.
+    With compact=True, vertices are kept in a VertexArray rather than a
+    list of Vertex objects.
+
+    Once the graph has been planned (or checked for cycles), it remembers
+    the default plan and a topological order. Single-edge and single-vertex
+    edits keep both up to date incrementally instead of starting over.
+    """
+
+    def __init__(self, storage=None, compact=False):
+        self.compact = compact
+        # a list of vertex objects, or a VertexArray
+        self.vertices = VertexArray() if compact else []
+        self.index = {}  # maps a vertex label to its index in vertices
+        if storage is None:
+            storage = AdjacencyList()
+        self.storage = storage  # edge storage backend
+        self._position = None  # topological position per vertex, if known
+        self._plan = None  # cached default plan as semesters of indices
+        self._semester_of = None  # semester per vertex in the cached plan
+        self._reachability = None  # ReachabilityIndex for the current edges
+
+    @classmethod
+    def load_compiled(cls, path):
+        """
+        Map a catalog written by registration_compiled.compile_graph into a
+        read-only, compact Graph, without parsing or copying its edges.
+
+        Raises:
+            ValueError: If the file is not a compiled catalog.
+        """
+        # pylint: disable=import-outside-toplevel
+        import mmap
+        import struct
+
+        header = struct.Struct(COMPILED_HEADER)
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < header.size:
+            buffer.close()
+            raise ValueError(f"{path} is not a compiled catalog.")
+        magic, num_vertices, num_edges, label_bytes = header.unpack_from(buffer)
+        labels_start = header.size + 4 * (3 * num_vertices + 2 + 2 * num_edges)
+        if magic != COMPILED_MAGIC or len(buffer) != labels_start + label_bytes:
+            buffer.close()
+            raise ValueError(f"{path} is not a compiled catalog.")
+
+        storage = CSRStorage(buffer, num_vertices, num_edges, header.size)
+        graph = cls(storage, compact=True)
+        labels = buffer[labels_start:].decode().split("\0") if num_vertices else []
+        graph.vertices.labels = labels
+        graph.vertices.visited = bytearray(num_vertices)
+        graph.index = dict(zip(labels, range(num_vertices)))
+        return graph
+
+    @property
+    def adjacency_matrix(self):
+        """
+        Adjacency matrix of edges, as a read-only AdjacencyMatrixView over
+        the edge storage. Reading an entry costs one has_edge call and
+        nothing is copied; writing raises TypeError, so add and remove
+        edges through the Graph. Call tolist() on it for a real matrix.
+        """
+        return AdjacencyMatrixView(self)
+
+    @property
+    def labels(self):
+        """The vertex labels, by index."""
+        if self.compact:
+            return self.vertices.labels
+        return [vertex.label for vertex in self.vertices]
+
+    def _label_getter(self):
+        """
+        Return a function from a vertex index to its label, without building
+        the whole list of labels the way the labels property does.
+        """
+        if self.compact:
+            return self.vertices.labels.__getitem__
+        vertices = self.vertices
+        return lambda i: vertices[i].label
+
+    def fingerprint(self, structure_only=False):
+        """
+        Return a hex digest of the vertex labels and the edge set, the same
+        for any two graphs with the same labels in the same order and the
+        same edges however they were added. With structure_only, labels are
+        left out, so graphs that only differ in their labels match.
+
+        Edges are hashed by vertex index, so this is not a canonical form:
+        two isomorphic graphs only match if the isomorphism keeps every
+        vertex at the same index.
+        """
+        import hashlib  # pylint: disable=import-outside-toplevel
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(b"%d\n" % len(self.vertices))
+        if not structure_only:
+            for label in self.labels:
+                text = str(label).encode()
+                digest.update(b"%d:%s" % (len(text), text))
+        get_successors = self.storage.get_successors
+        for i in range(len(self.vertices)):
+            successors = ",".join(map(str, sorted(get_successors(i))))
+            digest.update(b"%d:%s\n" % (i, successors.encode()))
+        return digest.hexdigest()
+
+    def edges(self):
+        """Yield every edge as a (start, finish) index pair."""
+        get_successors = self.storage.get_successors
+        for start in range(len(self.vertices)):
+            for finish in get_successors(start):
+                yield start, finish
+
+    def validate_plan(self, courses):
+        """
+        Check a plan for this graph in O(V + E) time.
+
+        Raises:
+            ValueError: As validate_plan does.
+        """
+        validate_plan(self.labels, self.edges(), courses)
 
     def has_vertex(self, label):
         """Check if a vertex is already in the graph"""
-        num_vertices = len(self.vertices)
-        for i in range(num_vertices):
-            if label == self.vertices[i].label:
-                return True
-        return False
+        return label in self.index
 
     def get_index(self, label):
         """Given a label get the index of a vertex"""
-        num_vertices = len(self.vertices)
-        for i in range(num_vertices):
-            if label == self.vertices[i].label:
-                return i
-        return -1
+        return self.index.get(label, -1)
+
+    def reindex(self, start=0):
+        """
+        Rebuild the label index for vertices[start:], e.g. after a vertex
+        was removed and the vertices after it shifted down by one.
+        """
+        labels = self.labels
+        for i in range(start, len(labels)):
+            self.index[labels[i]] = i
 
     def add_vertex(self, label):
         """Add a Vertex with a given label to the graph"""
-        if self.has_vertex(label):
+        if label in self.index:
             return
 
+        # storage goes first, so read-only storage leaves the graph untouched
+        self.storage.add_vertex()
+        self._reachability = None
+
         # add vertex to the list of vertices
-        self.vertices.append(Vertex(label))
+        new_index = len(self.vertices)
+        self.index[label] = new_index
+        if self.compact:
+            self.vertices.add(label)
+        else:
+            self.vertices.append(Vertex(label))
+
+        # a course without edges can go last in the topological order
+        if self._position is not None:
+            self._position.append(new_index)
+        if self._plan is not None:
+            # it is ready at once but loses every tie, so it lands in the
+            # first semester with a free seat
+            self._semester_of.append(-1)
+            first = 0
+            while (
+                first < len(self._plan)
+                and len(self._plan[first]) == MAX_COURSES_PER_SEMESTER
+            ):
+                first += 1
+            self._repair_plan(first, (new_index,))
 
-        # add a new column in the adjacency matrix
+    def add_edge(self, start, finish):
+        """Add unweighted directed edge to graph"""
+        # get_index returns -1 for an unknown label; like a matrix row, the
+        # storage treats negative indices as counting from the end
         num_vertices = len(self.vertices)
-        for i in range(num_vertices - 1):
-            self.adjacency_matrix[i].append(0)
+        if start < 0:
+            start += num_vertices
+        if finish < 0:
+            finish += num_vertices
+        self._reachability = None
+        if self._position is None:
+            self.storage.add_edge(start, finish)
+            return
+        if self.storage.has_edge(start, finish):
+            return
+        self.storage.add_edge(start, finish)
 
-        # add a new row for the new vertex
-        new_row = []
-        for i in range(num_vertices):
-            new_row.append(0)
-        self.adjacency_matrix.append(new_row)
+        if not self._order_after_edge(start, finish):
+            # the new edge closed a cycle, so there is no order or plan
+            self._forget_plan()
+            return
+        if self._plan is not None:
+            semester_of = self._semester_of
+            # semesters before the course's own are unaffected, and nothing
+            # changes at all if it already came after its new prerequisite
+            if semester_of[finish] <= semester_of[start]:
+                self._repair_plan(semester_of[finish], (start, finish))
+
+    def remove_edge(self, start, finish):
+        """Remove the directed edge start -> finish, if present"""
+        if not self.storage.has_edge(start, finish):
+            return
+        self.storage.remove_edge(start, finish)
+        self._reachability = None
+
+        # removing an edge may break a cycle, but it never invalidates a
+        # topological order we already have
+        if self._plan is not None:
+            semester_of = self._semester_of
+            # the course may now be ready as soon as its other prerequisites
+            # are taken, and not before
+            first = max(
+                (semester_of[i] + 1 for i in self.storage.get_predecessors(finish)),
+                default=0,
+            )
+            self._repair_plan(first, (start, finish))
+
+    def remove_vertex(self, label):
+        """Remove the Vertex with a given label and all of its edges"""
+        if label not in self.index:
+            return
+        removed = self.index[label]
+
+        first = None
+        if self._plan is not None:
+            # the removed course's seat and its courses' earliest semesters
+            # are the first things that can change
+            semester_of = self._semester_of
+            first = semester_of[removed]
+            for j in self.storage.get_successors(removed):
+                ready_at = max(
+                    (
+                        semester_of[i] + 1
+                        for i in self.storage.get_predecessors(j)
+                        if i != removed
+                    ),
+                    default=0,
+                )
+                first = min(first, ready_at)
+
+        self.storage.remove_vertex(removed)
+        self._reachability = None
+        del self.index[label]
+        self.vertices.pop(removed)
+        self.reindex(removed)
+
+        if self._position is not None:
+            position = self._position
+            gone = position.pop(removed)
+            for i, value in enumerate(position):
+                if value > gone:
+                    position[i] = value - 1
+        if self._plan is not None:
+            self._semester_of.pop(removed)
+            self._plan = [
+                [i - (i > removed) for i in semester if i != removed]
+                for semester in self._plan
+            ]
+            self._repair_plan(first, None)
+
+    def add_vertices(self, labels):
+        """Add a Vertex for every label, skipping labels already present"""
+        index = self.index
+        vertices = self.vertices
+        add_vertex = self.storage.add_vertex
+        if self.compact:
+            add_label = vertices.add
+        else:
+            def add_label(label):
+                vertices.append(Vertex(label))
+
+        self._forget_plan()
+        for label in labels:
+            if label in index:
+                continue
+            add_vertex()
+            index[label] = len(vertices)
+            add_label(label)
+
+    def add_edges(self, edges):
+        """Add an unweighted directed edge for every (start, finish) index pair"""
+        self._forget_plan()
+        num_vertices = len(self.vertices)
+        add_edge = self.storage.add_edge
+        for start, finish in edges:
+            if start < 0:
+                start += num_vertices
+            if finish < 0:
+                finish += num_vertices
+            add_edge(start, finish)
+
+    def add_edges_by_label(self, edges):
+        """Add an edge for every (prereq, course) label pair"""
+        get_index = self.index.get
+        self.add_edges(
+            (get_index(prereq, -1), get_index(course, -1)) for prereq, course in edges
+        )
+
+    def _forget_plan(self):
+        """Drop the cached plan, topological order and reachability index."""
+        self._reachability = None
+        self._position = None
+        self._plan = None
+        self._semester_of = None
+
+    def _remember_order(self, order):
+        """Cache a topological order given as a list of vertex indices."""
+        position = [0] * len(order)
+        for value, i in enumerate(order):
+            position[i] = value
+        self._position = position
+
+    def _order_after_edge(self, start, finish):
+        """
+        Update the cached topological order for a new edge start -> finish
+        with the Pearce-Kelly online algorithm, which only reorders the
+        vertices between the two endpoints.
 
-    def add_edge(self, start, finish):
-        """Add unweighted directed edge to graph"""
-        self.adjacency_matrix[start][finish] = 1
+        post: returns False if the edge closed a cycle, True otherwise.
+        """
+        position = self._position
+        lower, upper = position[finish], position[start]
+        if lower > upper:
+            return True
+        storage = self.storage
+
+        # courses reachable from finish that currently sit before start
+        forward = [finish]
+        seen = {finish}
+        stack = ArrayStack()
+        stack.push(finish)
+        while not stack.is_empty():
+            for j in storage.get_successors(stack.pop()):
+                if j == start:
+                    return False
+                if j not in seen and position[j] < upper:
+                    seen.add(j)
+                    forward.append(j)
+                    stack.push(j)
+
+        # courses that reach start and currently sit after finish
+        backward = [start]
+        seen = {start}
+        stack.push(start)
+        while not stack.is_empty():
+            for j in storage.get_predecessors(stack.pop()):
+                if j not in seen and position[j] > lower:
+                    seen.add(j)
+                    backward.append(j)
+                    stack.push(j)
+
+        # hand out the same positions again, backward set first
+        forward.sort(key=position.__getitem__)
+        backward.sort(key=position.__getitem__)
+        moved = backward + forward
+        slots = sorted(position[i] for i in moved)
+        for i, value in zip(moved, slots):
+            position[i] = value
+        return True
+
+    def _repair_plan(self, first, touched):
+        """
+        Replan the cached default plan from semester first onwards, keeping
+        the earlier semesters. When touched is a tuple of vertex indices,
+        stop as soon as they are all taken and the same set of courses has
+        been taken as in the old plan: from there on the old semesters are
+        still what the planner would choose.
+        """
+        stats = _INSTRUMENTATION
+        start = time.perf_counter() if stats is not None else 0.0
+        storage = self.storage
+        plan = self._plan
+        old_tail = plan[first:]
+        del plan[first:]
+        semester_of = self._semester_of
+
+        # only the old plan's later courses and a course new to the plan
+        # are left to take; everything before first stays where it is
+        untaken = {i for semester in old_tail for i in semester}
+        if touched is not None:
+            untaken.update(i for i in touched if semester_of[i] < 0)
+        in_degree = {}
+        ready = []
+        for i in untaken:
+            in_degree[i] = sum(1 for j in storage.get_predecessors(i) if j in untaken)
+            if in_degree[i] == 0:
+                ready.append(i)
+        heapq.heapify(ready)
+
+        # +1 for a course only the new plan has taken so far, -1 for one
+        # only the old plan has
+        balance = {}
+        unbalanced = 0
+        num_left = len(untaken)
+
+        while ready:
+            semester = [
+                heapq.heappop(ready)
+                for _ in range(min(MAX_COURSES_PER_SEMESTER, len(ready)))
+            ]
+            number = len(plan)
+            plan.append(semester)
+            num_left -= len(semester)
+            for i in semester:
+                untaken.discard(i)
+                semester_of[i] = number
+                for j in storage.get_successors(i):
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        heapq.heappush(ready, j)
+
+            if touched is None:
+                continue
+            old = old_tail[number - first] if number - first < len(old_tail) else ()
+            for i, change in itertools.chain(
+                ((i, 1) for i in semester), ((i, -1) for i in old)
+            ):
+                count = balance.get(i, 0)
+                unbalanced -= count != 0
+                balance[i] = count + change
+                unbalanced += count + change != 0
+            if unbalanced == 0 and not untaken.intersection(touched):
+                plan.extend(old_tail[number - first + 1 :])
+                num_left = 0
+                break
+
+        if num_left:
+            self._forget_plan()
+
+        if stats is not None:
+            stats.record(
+                "repair_plan",
+                start,
+                semesters_produced=len(plan) - first,
+            )
 
     def get_adjacent_vertices(self, vertex_index):
         """Return adjacent vertex indices to vertex_index"""
-        vertices = []
+        return sorted(self.storage.get_successors(vertex_index))
+
+    def reachability(self):
+        """
+        Return the ReachabilityIndex for the current edges, building it on
+        first use. Any edit to the graph discards it.
+        """
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(self)
+        return self._reachability
+
+    def _known_index(self, label):
+        """Return the index of label, raising ValueError if it is unknown."""
+        index = self.index.get(label, -1)
+        if index == -1:
+            raise ValueError(f"Unknown course: {label}")
+        return index
+
+    def is_prerequisite(self, prereq, course):
+        """
+        Return True if the course labeled prereq must be taken, directly or
+        indirectly, before the course labeled course.
+
+        Raises:
+            ValueError: If either label is not in the graph.
+        """
+        start, finish = self._known_index(prereq), self._known_index(course)
+        return self.reachability().reaches(start, finish)
+
+    def get_prerequisites(self, course):
+        """
+        Return the labels of every direct or indirect prerequisite of course,
+        in vertex order.
+
+        Raises:
+            ValueError: If the label is not in the graph.
+        """
+        reachability = self.reachability()
+        bits = reachability.ancestor_bits(self._known_index(course))
+        label_of = self._label_getter()
+        return [label_of(i) for i in reachability.indices(bits)]
+
+    def get_dependents(self, course):
+        """
+        Return the labels of every course that needs course, directly or
+        indirectly, in vertex order.
+
+        Raises:
+            ValueError: If the label is not in the graph.
+        """
+        reachability = self.reachability()
+        bits = reachability.descendant_bits(self._known_index(course))
+        label_of = self._label_getter()
+        return [label_of(i) for i in reachability.indices(bits)]
+
+    def topological_order(self):
+        """
+        Return the vertex indices in an order where every prerequisite comes
+        before its courses, or None if there is a cycle.
+        """
+        storage = self.storage
+        if storage.vectorized:
+            return storage.topological_order()
+        num_vertices = len(self.vertices)
+        in_degree = storage.in_degrees()
+        order = [i for i in range(num_vertices) if in_degree[i] == 0]
+        for i in order:  # order grows while we walk it
+            for j in storage.get_successors(i):
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    order.append(j)
+        if len(order) < num_vertices:
+            return None
+        return order
+
+    def critical_path_lengths(self):
+        """
+        Return, per vertex index, the number of courses on the longest
+        prerequisite chain starting at that vertex (1 for a course that is
+        not a prerequisite of anything), or None if there is a cycle.
+        Runs in O(V+E).
+        """
+        order = self.topological_order()
+        if order is None:
+            return None
+        storage = self.storage
+        lengths = [1] * len(order)
+        for i in reversed(order):
+            for j in storage.get_successors(i):
+                if lengths[j] + 1 > lengths[i]:
+                    lengths[i] = lengths[j] + 1
+        return lengths
+
+    def descendant_counts(self):
+        """
+        Return, per vertex index, how many courses depend on that vertex
+        directly or indirectly, or None if there is a cycle. Descendant sets
+        are merged as integer bitsets, so this is O(V*E/64) rather than
+        linear, which is still cheap at catalog sizes.
+        """
+        order = self.topological_order()
+        if order is None:
+            return None
+        storage = self.storage
+        reach = [0] * len(order)
+        for i in reversed(order):
+            bits = 0
+            for j in storage.get_successors(i):
+                bits |= reach[j] | (1 << j)
+            reach[i] = bits
+        return [bin(bits).count("1") for bits in reach]
+
+    def _plan_with_constraints(self, constraints, order, rank, needed=None):
+        """
+        Plan semesters under a PlanConstraints, taking ready courses best
+        rank first (vertex order when order is None) while they fit.
+
+        Ready courses wait in heaps keyed by weight: one set of heaps for
+        courses offered every term and one per term for the others, so a
+        semester only looks at courses it can offer. Each pick compares the
+        tops of the heaps whose weight still fits, so a course too heavy for
+        what is left of a semester stays where it is until the next one.
+        When needed is a set of vertex indices, only those courses are
+        planned.
+
+        post: returns a list of semesters of vertex indices, or None if the
+        prerequisites form a cycle.
+        """
+        storage = self.storage
+        label_of = self._label_getter()
+        # per-request state only covers the courses to plan
+        in_degree, courses = self._prerequisite_counts(needed)
+        num_courses = len(courses)
+        get_weight = constraints.weights.get
+        weight = {i: get_weight(label_of(i), 1) for i in courses}
+        lightest = min(weight.values(), default=1)
+        if rank is None:
+            rank = range(len(self.vertices))
+            order = rank
+
+        # weight -> heap of ranks, for every term and for every term at once
+        anytime = {}
+        by_term = {term: {} for term in constraints.terms}
+        get_offerings = constraints.offerings.get
+        num_ready = 0
+
+        def push(heaps, i):
+            """Put course i in the heap of its weight."""
+            if weight[i] not in heaps:
+                heaps[weight[i]] = []
+            heapq.heappush(heaps[weight[i]], rank[i])
+
+        def make_ready(i):
+            """Put course i in the heaps of the terms it is offered in."""
+            nonlocal num_ready
+            num_ready += 1
+            offered_in = get_offerings(label_of(i))
+            if offered_in is None:
+                push(anytime, i)
+                return
+            terms = [term for term in offered_in if term in by_term]
+            if not terms:
+                raise ValueError(f"Course {label_of(i)} is never offered.")
+            for term in terms:
+                push(by_term[term], i)
+
+        for i in courses:
+            if in_degree[i] == 0:
+                make_ready(i)
+
+        taken = set()
+        semesters = []
+        num_planned = 0
+        empty_in_a_row = 0
+
+        while num_planned < num_courses:
+            number = len(semesters)
+            room = constraints.capacity_of(number)
+            groups = (anytime, by_term[constraints.term_of(number)])
+            semester = []
+
+            while room >= lightest:
+                # best ready course offered this term that still fits,
+                # skipping entries for courses already taken in another
+                # term's heap
+                best = None
+                for heaps in groups:
+                    for course_weight, heap in heaps.items():
+                        if course_weight > room:
+                            continue
+                        while heap and order[heap[0]] in taken:
+                            heapq.heappop(heap)
+                        if heap and (best is None or heap[0] < best[0]):
+                            best = heap
+                if best is None:
+                    break
+                i = order[heapq.heappop(best)]
+                taken.add(i)
+                num_ready -= 1
+                room -= weight[i]
+                semester.append(i)
+
+            if not semester:
+                if num_ready == 0:
+                    return None  # nothing is ready: the rest is a cycle
+                empty_in_a_row += 1
+                if empty_in_a_row > 2 * len(constraints.terms):
+                    raise ValueError(
+                        "The constraints never let "
+                        f"{num_courses - num_planned} course(s) be taken."
+                    )
+            else:
+                empty_in_a_row = 0
+            semesters.append(semester)
+            num_planned += len(semester)
+
+            # release the courses whose last prerequisite was just taken
+            for i in semester:
+                for j in storage.get_successors(i):
+                    if needed is not None and j not in needed:
+                        continue
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        make_ready(j)
+
+        return semesters
+
+    def get_optimal_registration_plan(self, max_vertices=24):
+        """
+        Return a registration plan with the fewest possible semesters, found
+        by an exact branch-and-bound search. The search is exponential, so it
+        is meant for small graphs, e.g. to measure how far the heuristic
+        plans of get_registration_plan are from optimal.
+
+        Args:
+            max_vertices: Optional; refuse graphs with more vertices than this.
+
+        Raises:
+            ValueError: If the graph has more than max_vertices vertices.
+            CycleError: If the prerequisites form a cycle.
+        """
+        num_vertices = len(self.vertices)
+        if num_vertices > max_vertices:
+            raise ValueError(
+                f"Exact planning is limited to {max_vertices} vertices, "
+                f"the graph has {num_vertices}."
+            )
+        lengths = self.critical_path_lengths()
+        if lengths is None:
+            raise CycleError("Cannot plan registration for a graph with a cycle.")
+
+        solve = self._semester_solver(lengths)
+        everything = (1 << num_vertices) - 1
+        labels = self.labels
+        courses = []
+        taken = 0
+        while taken != everything:
+            semester = sorted(solve(taken)[1])
+            courses.append([labels[i] for i in semester])
+            for i in semester:
+                taken |= 1 << i
+        return courses
+
+    def _semester_solver(self, lengths):
+        """
+        Return a memoized function of a taken mask that returns (semesters
+        left, next semester) for the fewest remaining semesters, by
+        branch-and-bound over full semesters.
+        """
+        storage = self.storage
+        num_vertices = len(self.vertices)
+        cap = MAX_COURSES_PER_SEMESTER
+        prereq_masks = [0] * num_vertices
+        for i in range(num_vertices):
+            for j in storage.get_successors(i):
+                prereq_masks[j] |= 1 << i
+        everything = (1 << num_vertices) - 1
+        best = {everything: (0, ())}  # taken mask -> (semesters left, next semester)
+
+        def lower_bound(taken, ready):
+            """Semesters still needed, by course count and by longest chain."""
+            remaining = num_vertices - bin(taken).count("1")
+            return max(-(-remaining // cap), max(lengths[i] for i in ready))
+
+        def solve(taken):
+            """Return (semesters left, next semester) for the taken mask."""
+            if taken in best:
+                return best[taken]
+            ready = [
+                i
+                for i in range(num_vertices)
+                if not taken >> i & 1 and prereq_masks[i] & taken == prereq_masks[i]
+            ]
+            ready.sort(key=lambda i: -lengths[i])
+            bound = lower_bound(taken, ready)
+            result = (num_vertices + 1, ())
+            # taking fewer ready courses than fit never helps: a ready course
+            # left out could always move into this semester instead
+            for semester in itertools.combinations(ready, min(cap, len(ready))):
+                if result[0] <= bound:
+                    break
+                mask = taken
+                for i in semester:
+                    mask |= 1 << i
+                left = solve(mask)[0] + 1
+                if left < result[0]:
+                    result = (left, semester)
+            best[taken] = result
+            return result
+
+        return solve
+
+    def iter_alternative_plans(self, weights=None, max_vertices=24):
+        """
+        Return an iterator over distinct registration plans, best first: by
+        number of semesters and then by the sum over courses of weight times
+        the semester the course is taken in (counting from 0). Every
+        semester takes as many ready courses as fit, as in
+        get_optimal_registration_plan, so the first plan is an optimal one.
+
+        The plans are found by a best-first (A*) search over partial plans.
+        Partial plans share their common semesters, and the ready courses
+        and lower bounds of every set of taken courses are computed once,
+        so each further plan only costs the search it adds.
+
+        Args:
+            weights: Optional; a non-negative weight per vertex index, where
+                heavier courses are better taken early. Every weight is 1
+                by default.
+            max_vertices: Optional; refuse graphs with more vertices than this.
+
+        Raises:
+            ValueError: If the graph has more than max_vertices vertices.
+            CycleError: If the prerequisites form a cycle.
+        """
+        num_vertices = len(self.vertices)
+        if num_vertices > max_vertices:
+            raise ValueError(
+                f"Exact planning is limited to {max_vertices} vertices, "
+                f"the graph has {num_vertices}."
+            )
+        lengths = self.critical_path_lengths()
+        if lengths is None:
+            raise CycleError("Cannot plan registration for a graph with a cycle.")
+        if weights is None:
+            weights = [1] * num_vertices
+        return self._search_plans(lengths, list(weights))
+
+    def get_alternative_plans(self, k, weights=None, max_vertices=24):
+        """
+        Return the k best distinct plans of iter_alternative_plans as a list,
+        which is shorter when fewer than k plans exist.
+        """
+        return list(itertools.islice(self.iter_alternative_plans(weights, max_vertices), k))
+
+    def _search_plans(self, lengths, weights):
+        """Yield the plans of iter_alternative_plans, best first."""
+        storage = self.storage
         num_vertices = len(self.vertices)
-        for j in range(num_vertices):
-            if self.adjacency_matrix[vertex_index][j]:
-                vertices.append(j)
-        return vertices
+        cap = MAX_COURSES_PER_SEMESTER
+        prereq_masks = [0] * num_vertices
+        for i in range(num_vertices):
+            for j in storage.get_successors(i):
+                prereq_masks[j] |= 1 << i
+        everything = (1 << num_vertices) - 1
+        solve = self._semester_solver(lengths)
+        subproblems = {}  # taken mask -> (ready courses, sorted weights left)
+
+        def subproblem(taken):
+            """Return what every partial plan that took the taken mask shares."""
+            if taken not in subproblems:
+                left = [i for i in range(num_vertices) if not taken >> i & 1]
+                ready = [i for i in left if prereq_masks[i] & taken == prereq_masks[i]]
+                left_weights = sorted((weights[i] for i in left), reverse=True)
+                subproblems[taken] = (ready, left_weights)
+            return subproblems[taken]
+
+        def score_bound(taken, semester):
+            """The least weighted score the courses not taken can still add."""
+            return sum(
+                weight * (semester + position // cap)
+                for position, weight in enumerate(subproblem(taken)[1])
+            )
+
+        # The semester part of the bound is exact, so only partial plans
+        # that can still finish in the fewest semesters come first. Ties go
+        # to the deepest partial plan, which reaches a full plan quickly.
+        # Entries are (semester bound, score bound, -semesters, tie,
+        # semesters, score, taken, plan), where plan is a Node chain of
+        # semesters, last semester first.
+        frontier = [(solve(0)[0], score_bound(0, 0), 0, 0, 0, 0, 0, None)]
+        tie = itertools.count(1)
+        labels = self.labels
+        while frontier:
+            entry = heapq.heappop(frontier)
+            semesters, score, taken, plan = entry[4:]
+            if taken == everything:
+                courses = []
+                while plan is not None:
+                    courses.append([labels[i] for i in plan.data])
+                    plan = plan.next
+                courses.reverse()
+                yield courses
+                continue
+            ready = subproblem(taken)[0]
+            for semester in itertools.combinations(ready, min(cap, len(ready))):
+                mask = taken
+                added = 0
+                for i in semester:
+                    mask |= 1 << i
+                    added += weights[i] * semesters
+                heapq.heappush(
+                    frontier,
+                    (
+                        semesters + 1 + solve(mask)[0],
+                        score + added + score_bound(mask, semesters + 1),
+                        -semesters - 1,
+                        next(tie),
+                        semesters + 1,
+                        score + added,
+                        mask,
+                        Node(semester, plan),
+                    ),
+                )
 
     # WORKS
     def has_cycle(self):
         """
         Determine whether or not the graph has a cycle.
-        
+
         post: returns True if there is a cycle and False otherwise.
         """
-        # defining recursive function
-        def dfs(vertex, visited, stack):
-            # adding to visited
-            visited[vertex] = True
-            # add to stack
-            stack[vertex] = True
-
-            # check neighbors
-            for adjacent in self.get_adjacent_vertices(vertex):
-                # if not explored yet
-                if not visited[adjacent]:
-                    # add to stack and explore
-                    if dfs(adjacent, visited, stack):
-                        return True
-                # if neighbor already exolored
-                elif stack[adjacent]:
-                    return True
-
-            # remove vertex from stack
-            stack[vertex] = False
-            # know, no cycle
+        if self._position is not None:
             return False
+        stats = _INSTRUMENTATION
+        start = time.perf_counter() if stats is not None else 0.0
+        order = self.topological_order()
+        if order is not None:
+            self._remember_order(order)
+        if stats is not None:
+            stats.record(
+                "has_cycle",
+                start,
+                vertices_visited=len(self.vertices),
+                edges_scanned=sum(self.storage.in_degrees()),
+            )
+        return order is None
+
+    def find_cycle(self):
+        """
+        Find a cycle with an iterative three-color depth-first search, so
+        long prerequisite chains cannot hit the recursion limit.
 
+        post: returns the labels along one cycle, where the first and last
+        labels are the same, or None if there is no cycle.
+        """
+        # white: not explored, gray: on the current path, black: finished
+        white, gray, black = 0, 1, 2
+        storage = self.storage
         num_vertices = len(self.vertices)
-        visited = [False] * num_vertices
-        stack = [False] * num_vertices
+        color = bytearray(num_vertices)
+        parent = [-1] * num_vertices
+        stack = ArrayStack()
 
         # iterate
-        for vertex in range(num_vertices):
-            if not visited[vertex]:
-                # recursive call
-                if dfs(vertex, visited, stack):
-                    return True
+        for root in range(num_vertices):
+            if color[root] != white:
+                continue
+            color[root] = gray
+            stack.push((root, iter(storage.get_successors(root))))
+
+            while not stack.is_empty():
+                vertex, adjacent_vertices = stack.peek()
+                # resume the neighbor scan where this vertex left off
+                for adjacent in adjacent_vertices:
+                    if color[adjacent] == white:
+                        color[adjacent] = gray
+                        parent[adjacent] = vertex
+                        stack.push((adjacent, iter(storage.get_successors(adjacent))))
+                        break
+                    # neighbor is on the current path, so we closed a loop
+                    if color[adjacent] == gray:
+                        cycle = [adjacent]
+                        while vertex != adjacent:
+                            cycle.append(vertex)
+                            vertex = parent[vertex]
+                        cycle.append(adjacent)
+                        cycle.reverse()
+                        labels = self.labels
+                        return [labels[i] for i in cycle]
+                else:
+                    # every neighbor explored, no cycle through this vertex
+                    color[vertex] = black
+                    stack.pop()
+
+        return None
+
+    def strongly_connected_components(self):
+        """
+        Split the graph into strongly connected components with an iterative
+        version of Tarjan's algorithm, in one pass over the edges.
+
+        post: returns a list of components, each a sorted list of vertex
+        indices. A course depends on courses in its own or earlier
+        components only, so the list is a topological order of the
+        condensed graph.
+        """
+        storage = self.storage
+        num_vertices = len(self.vertices)
+        order = [-1] * num_vertices  # discovery time, -1 if not visited
+        low = [0] * num_vertices  # earliest discovery time reachable
+        on_stack = bytearray(num_vertices)
+        found = []  # visited vertices whose component is still open
+        components = []
+        counter = 0
+        stack = ArrayStack()
+
+        for root in range(num_vertices):
+            if order[root] != -1:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            found.append(root)
+            on_stack[root] = 1
+            stack.push((root, iter(storage.get_successors(root))))
+
+            while not stack.is_empty():
+                vertex, adjacent_vertices = stack.peek()
+                # resume the neighbor scan where this vertex left off
+                for adjacent in adjacent_vertices:
+                    if order[adjacent] == -1:
+                        order[adjacent] = low[adjacent] = counter
+                        counter += 1
+                        found.append(adjacent)
+                        on_stack[adjacent] = 1
+                        stack.push((adjacent, iter(storage.get_successors(adjacent))))
+                        break
+                    if on_stack[adjacent] and order[adjacent] < low[vertex]:
+                        low[vertex] = order[adjacent]
+                else:
+                    stack.pop()
+                    if not stack.is_empty():
+                        parent = stack.peek()[0]
+                        low[parent] = min(low[parent], low[vertex])
+                    # vertex is the first of its component to be found
+                    if low[vertex] == order[vertex]:
+                        component = []
+                        while True:
+                            member = found.pop()
+                            on_stack[member] = 0
+                            component.append(member)
+                            if member == vertex:
+                                break
+                        component.sort()
+                        components.append(component)
+
+        # Tarjan's algorithm closes dependent components first
+        components.reverse()
+        return components
+
+    def cycle_groups(self):
+        """
+        Find every group of courses that are prerequisites of each other.
+
+        post: returns a list of groups, each a list of labels in vertex
+        order, for every strongly connected component with more than one
+        vertex or a course that requires itself. An empty list means the
+        graph has no cycle.
+        """
+        labels = self.labels
+        has_edge = self.storage.has_edge
+        return [
+            [labels[i] for i in component]
+            for component in self.strongly_connected_components()
+            if len(component) > 1 or has_edge(component[0], component[0])
+        ]
+
+    def condensation(self):
+        """
+        Collapse every strongly connected component into one vertex.
+
+        post: returns (dag, component_of), where dag is an acyclic Graph
+        whose vertex labels are tuples of the member labels of each
+        component, and component_of[i] is the index in dag of the component
+        of vertex i. dag can be planned even when this graph has cycles.
+        """
+        components = self.strongly_connected_components()
+        component_of = [0] * len(self.vertices)
+        for number, component in enumerate(components):
+            for i in component:
+                component_of[i] = number
+
+        labels = self.labels
+        get_successors = self.storage.get_successors
+        edges = set()
+        for number, component in enumerate(components):
+            for i in component:
+                for j in get_successors(i):
+                    if component_of[j] != number:
+                        edges.add((number, component_of[j]))
+
+        dag = Graph()
+        dag.add_vertices([tuple(labels[i] for i in component) for component in components])
+        dag.add_edges(sorted(edges))
+        return dag, component_of
+
+    def weakly_connected_components(self):
+        """
+        Split the graph into groups of courses linked by prerequisites in
+        either direction.
+
+        post: returns a list of components, each a sorted list of vertex
+        indices, ordered by their smallest index.
+        """
+        storage = self.storage
+        num_vertices = len(self.vertices)
+        seen = bytearray(num_vertices)
+        components = []
+        for root in range(num_vertices):
+            if seen[root]:
+                continue
+            seen[root] = 1
+            component = [root]
+            for vertex in component:  # component grows while we walk it
+                for adjacent in itertools.chain(
+                    storage.get_successors(vertex), storage.get_predecessors(vertex)
+                ):
+                    if not seen[adjacent]:
+                        seen[adjacent] = 1
+                        component.append(adjacent)
+            component.sort()
+            components.append(component)
+        return components
+
+    def subgraph(self, indices):
+        """
+        Copy the vertices at indices and the edges between them into a new
+        Graph with the default storage.
 
-        return False
+        post: returns the new Graph; vertex k of it is vertex indices[k].
+        """
+        storage = self.storage
+        local = {i: k for k, i in enumerate(indices)}
+        labels = self.labels
+        graph = Graph()
+        graph.add_vertices([labels[i] for i in indices])
+        graph.add_edges(
+            (k, local[j])
+            for i, k in local.items()
+            for j in storage.get_successors(i)
+            if j in local
+        )
+        return graph
 
     # WORKS
-    def get_registration_plan(self):
+    def get_registration_plan(
+        self, priority=None, constraints=None, completed=None, targets=None
+    ):
         """
         Return a valid ordering of courses to take for registration as a 2D
         list of vertex labels, where each inner list will be a maximum of 4.
+        iter_registration_plan produces the same semesters one at a time.
+
+        Args:
+            priority: Optional; how to choose among ready courses when more
+                than four are ready. None takes them in vertex order,
+                "critical_path" prefers the longest remaining prerequisite
+                chain, "descendants" prefers courses that unlock the most
+                other courses, and a list gives a score per vertex index
+                (higher first).
+            constraints: Optional; a PlanConstraints to use instead of the
+                four course limit. Semesters in which nothing can be taken
+                are kept as empty lists so semesters stay aligned with terms.
+            completed: Optional; labels of courses already taken. They are
+                left out of the plan and count as satisfied prerequisites.
+            targets: Optional; labels of the courses to plan for. Only they
+                and their prerequisites that are not completed are planned.
 
         pre: a valid registration plan exists.
         post: returns a 2D list of strings, where each inner list represents a semester
+
+        Raises:
+            CycleError: If the prerequisites form a cycle.
+            ValueError: If the priority is an unknown name or a score list
+                whose length is not the number of vertices, the constraints
+                never let some course be taken, or a completed or target
+                label is not in the graph.
+        """
+        courses = self.try_registration_plan(priority, constraints, completed, targets)
+        if courses is None:
+            raise CycleError("Cannot plan registration for a graph with a cycle.")
+        return courses
+
+    def _ranking(self, priority):
         """
+        Rank the vertices for a priority once, so planners can keep ranks in
+        a min-heap.
 
-        # Because we don't want to destroy the original graph,
-        # we have defined helper functions that work with a copy of the
-        # adjacency matrix and vertices. This is also a hint that we
-        # suggest you to manipulate the graph copy to solve this method.
-        temp_vertices = list(self.vertices)
-        temp_matrix = []
-        for row in self.adjacency_matrix:
-            temp_matrix.append(list(row))
-
-        def get_index_from_copy(label, vertices_copy):
-            """Given a label get the index of a vertex in the copy of the vertices list"""
-            num_vertices = len(vertices_copy)
-            for i in range(num_vertices):
-                if label == vertices_copy[i].label:
-                    return i
-            return -1
-
-        def delete_vertex_from_copy(vertex_label, adjacency_matrix_copy, vertices_copy):
-            """delete vertex from the copy of the adjacency matrix and vertices list"""
-            index = get_index_from_copy(vertex_label, vertices_copy)
-
-            for row in adjacency_matrix_copy:
-                row.pop(index)
-            adjacency_matrix_copy.pop(index)
-            vertices_copy.pop(index)
+        post: returns (order, rank), where order lists the vertex indices
+        best first and rank[i] is the position of i in order; (None, None)
+        for vertex order; or None if the priority needs an acyclic graph
+        and there is a cycle.
 
-        courses = []
+        Raises:
+            ValueError: If the priority is an unknown name or has the wrong
+                number of scores.
+        """
+        if priority is None:
+            return None, None
+        if priority == "critical_path":
+            scores = self.critical_path_lengths()
+        elif priority == "descendants":
+            scores = self.descendant_counts()
+        elif isinstance(priority, str):
+            raise ValueError(f"Unknown priority {priority!r}.")
+        else:
+            scores = list(priority)
+            if len(scores) != len(self.vertices):
+                raise ValueError(
+                    f"Priority has {len(scores)} scores, "
+                    f"the graph has {len(self.vertices)} vertices."
+                )
+        if scores is None:
+            return None
+        order = sorted(range(len(scores)), key=lambda i: (-scores[i], i))
+        rank = [0] * len(order)
+        for position, i in enumerate(order):
+            rank[i] = position
+        return order, rank
+
+    def _needed_courses(self, completed, targets):
+        """
+        Return the set of vertex indices a student still has to plan: the
+        targets (every course when targets is None) and their prerequisites,
+        direct or indirect, minus the completed courses. Prerequisites of a
+        completed course are taken to be satisfied.
+        """
+        done = {self._known_index(label) for label in completed or ()}
+        if targets is None:
+            return {i for i in range(len(self.vertices)) if i not in done}
+
+        get_predecessors = self.storage.get_predecessors
+        needed = set()
+        found = []
+        for label in targets:
+            i = self._known_index(label)
+            if i not in done and i not in needed:
+                needed.add(i)
+                found.append(i)
+        for i in found:  # found grows while we walk it
+            for j in get_predecessors(i):
+                if j not in done and j not in needed:
+                    needed.add(j)
+                    found.append(j)
+        return needed
+
+    def _prerequisite_counts(self, needed):
+        """
+        Count the prerequisites left for every course to plan.
+
+        post: returns (in_degree, courses), where courses lists the indices
+        to plan in vertex order and in_degree[i] is the count for i. For a
+        needed set, in_degree is a dict holding only the needed courses.
+        """
+        storage = self.storage
+        if needed is None:
+            return storage.in_degrees(), range(len(self.vertices))
+        in_degree = {}
+        for i in needed:
+            in_degree[i] = sum(1 for j in storage.get_predecessors(i) if j in needed)
+        return in_degree, sorted(needed)
+
+    def try_registration_plan(
+        self, priority=None, constraints=None, completed=None, targets=None
+    ):
+        """
+        Plan registration and detect cycles in the same pass.
+
+        Planning for completed and targets only keeps per-request state for
+        the courses still needed, so one Graph can serve many students
+        without being copied or changed.
+
+        post: returns the plan as get_registration_plan does, or None if the
+        prerequisites form a cycle.
+        """
+        stats = _INSTRUMENTATION
+        start = time.perf_counter() if stats is not None else 0.0
+        try:
+            courses = list(
+                self.iter_registration_plan(priority, constraints, completed, targets)
+            )
+        except CycleError:
+            courses = None
+        if stats is None:
+            return courses
+
+        planned = [self.index[label] for semester in courses or () for label in semester]
+        get_successors = self.storage.get_successors
+        stats.record(
+            "get_registration_plan",
+            start,
+            semesters_produced=len(courses or ()),
+            vertices_visited=len(planned),
+            edges_scanned=sum(len(get_successors(i)) for i in planned),
+        )
+        return courses
 
-        while temp_vertices:
-            semester_courses = []
+    def iter_registration_plan(
+        self, priority=None, constraints=None, completed=None, targets=None
+    ):
+        """
+        Return an iterator over the semesters get_registration_plan would
+        return, each a list of vertex labels.
+
+        The default planner only releases the courses unlocked by a semester
+        when the next semester is asked for, so stopping early skips the
+        rest of the work. Plans with constraints are still built whole
+        before the first semester. The graph must not change while the
+        iterator is in use.
+
+        The arguments are those of get_registration_plan. Missing labels and
+        cycles found while ranking raise here; a cycle found while planning
+        raises CycleError from the iterator once every semester before it
+        has been produced.
+        """
+        needed = None
+        if completed is not None or targets is not None:
+            needed = self._needed_courses(completed, targets)
+        elif priority is None and constraints is None and self._plan is not None:
+            return self._label_semesters(list(self._plan))
+
+        # rank the vertices once; the heap below pops the lowest rank first
+        ranking = self._ranking(priority)
+        if ranking is None:
+            raise CycleError("Cannot plan registration for a graph with a cycle.")
+        order, rank = ranking
+
+        if constraints is not None:
+            semesters = self._plan_with_constraints(constraints, order, rank, needed)
+            if semesters is None:
+                raise CycleError("Cannot plan registration for a graph with a cycle.")
+            return self._label_semesters(semesters)
+
+        remember = priority is None and needed is None
+        return self._label_semesters(self._iter_semesters(order, rank, needed, remember))
+
+    def _label_semesters(self, semesters):
+        """Yield every semester of vertex indices as a list of labels."""
+        label_of = self._label_getter()
+        for semester in semesters:
+            yield [label_of(i) for i in semester]
+
+    def _iter_semesters(self, order, rank, needed, remember):
+        """
+        Yield the semesters of the four course planner as lists of vertex
+        indices, ranked by order and rank when they are given and limited to
+        the needed courses when needed is given.
 
-            # finding vertices w no incoming edges
-            for i, vertex in enumerate(temp_vertices):
-                # no prereq
-                if all(temp_matrix[j][i] == 0 for j in range(len(temp_vertices))):
-                    semester_courses.append(vertex.label)
+        Raises:
+            CycleError: After the last semester, if some course was never
+                released.
+        """
+        storage = self.storage
+
+        # Kahn's algorithm: count the prerequisites of every course and
+        # release a course once all of its prerequisites have been taken.
+        # Ready courses are kept in a min-heap of vertex indices (or of ranks,
+        # when a priority is given) so that by default each semester picks the
+        # same first four courses (in vertex order) as a scan of the remaining
+        # graph would. Courses released by this semester only join the heap
+        # after the semester is chosen, so no prerequisite is ever taken in
+        # the same semester as its course.
+        in_degree, courses = self._prerequisite_counts(needed)
+        num_courses = len(courses)
+        semesters = [] if remember else None
+        num_planned = 0
+        ready = []
+        if order is None and needed is None and storage.vectorized:
+            planned = storage.plan_semesters(MAX_COURSES_PER_SEMESTER)
+            if planned is not None:
+                num_planned = num_courses
+                for semester in planned:
+                    if remember:
+                        semesters.append(semester)
+                    yield semester
+        elif order is None:
+            ready = [i for i in courses if in_degree[i] == 0]
+        else:
+            ready = [rank[i] for i in courses if in_degree[i] == 0]
+            heapq.heapify(ready)
 
+        while ready:
             # only 4 courses per sem
-            semester_courses = semester_courses[:4]
+            semester = [
+                heapq.heappop(ready)
+                for _ in range(min(MAX_COURSES_PER_SEMESTER, len(ready)))
+            ]
+            if order is not None:
+                semester = [order[position] for position in semester]
+            num_planned += len(semester)
 
             # add to plan
-            courses.append(semester_courses)
+            if remember:
+                semesters.append(semester)
+            yield semester
+
+            # release the courses whose last prerequisite was just taken
+            for i in semester:
+                for j in storage.get_successors(i):
+                    if needed is not None and j not in needed:
+                        continue
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        heapq.heappush(ready, j if order is None else rank[j])
+
+        # courses on a cycle never run out of prerequisites
+        if num_planned < num_courses:
+            raise CycleError("Cannot plan registration for a graph with a cycle.")
+
+        if remember:
+            # the plan itself is a topological order
+            self._plan = semesters
+            self._semester_of = [0] * num_courses
+            for number, semester in enumerate(semesters):
+                for i in semester:
+                    self._semester_of[i] = number
+            self._remember_order([i for semester in semesters for i in semester])
+
+
+def validate_plan(labels, edges, courses, cap=MAX_COURSES_PER_SEMESTER):
+    """
+    Check a registration plan in O(V + E) time.
+
+    Args:
+        labels: The vertex labels, by index.
+        edges: An iterable of (prereq, course) index pairs.
+        courses: The plan, a list of semesters of labels.
+        cap: Optional; the most courses a semester may hold.
+
+    Raises:
+        ValueError: If a semester is empty or holds more than cap courses,
+            a course is unknown, repeated or missing, or a prerequisite is
+            not taken in an earlier semester than its course.
+    """
+    known = dict(zip(labels, range(len(labels))))
+    semester_of = [-1] * len(labels)
+    for number, semester in enumerate(courses):
+        if not 0 < len(semester) <= cap:
+            raise ValueError(f"Semester {number} has {len(semester)} courses.")
+        for label in semester:
+            i = known.get(label)
+            if i is None:
+                raise ValueError(f"Course {label} is not in the catalog.")
+            if semester_of[i] != -1:
+                raise ValueError(f"Course {label} is planned twice.")
+            semester_of[i] = number
+    if -1 in semester_of:
+        missing = labels[semester_of.index(-1)]
+        raise ValueError(f"Course {missing} is not planned.")
+    for start, finish in edges:
+        if semester_of[start] >= semester_of[finish]:
+            raise ValueError(
+                f"Prerequisite {labels[start]} is not before {labels[finish]}."
+            )
+
+
+def parse_catalog(text):
+    """
+    Parse a whole catalog: the number of courses, one label per line, the
+    number of edges, then one "prereq course" pair per line.
 
-            # Remove the courses from the graph (delete them from both adjacency matrix and
-            # vertices list)
-            for course_label in semester_courses:
-                delete_vertex_from_copy(course_label, temp_matrix, temp_vertices)
+    Returns:
+        A tuple of the list of labels and the list of (prereq, course) pairs.
 
-        return courses
+    Raises:
+        ValueError: If a count is missing or not a number, the catalog ends
+            early, or an edge line does not hold exactly two courses.
+    """
+    lines = text.splitlines()
+    counts = []
+    start = 0
+    for kind in ("vertices", "edges"):
+        if start >= len(lines):
+            raise ValueError(f"Catalog ended before the number of {kind}.")
+        count = int(lines[start])
+        found = len(lines) - start - 1
+        if found < count:
+            raise ValueError(f"Catalog ended with {count - found} {kind} missing.")
+        counts.append(count)
+        start += count + 1
+    num_vertices = counts[0]
+
+    labels = [line.strip() for line in lines[1 : num_vertices + 1]]
+    pairs = [tuple(line.split()) for line in lines[num_vertices + 2 : start]]
+    for pair in pairs:
+        if len(pair) != 2:
+            raise ValueError(
+                f"Edge line {' '.join(pair)!r} does not hold two courses."
+            )
+    return labels, pairs
+
+
+def iter_catalog(stream, batch_size=65536):
+    """
+    Read a catalog one line at a time, for files too large to hold at once.
+
+    Yields:
+        ("vertices", labels) and then ("edges", pairs) tuples, where each
+        list holds at most batch_size items.
+    """
+    lines = iter(stream)
+    for kind in ("vertices", "edges"):
+        line = next(lines, None)
+        if line is None:
+            raise ValueError(f"Catalog ended before the number of {kind}.")
+        remaining = int(line)
+        while remaining:
+            batch = []
+            for line in itertools.islice(lines, min(batch_size, remaining)):
+                batch.append(line.strip() if kind == "vertices" else tuple(line.split()))
+                if kind == "edges" and len(batch[-1]) != 2:
+                    raise ValueError(
+                        f"Edge line {line.strip()!r} does not hold two courses."
+                    )
+            if not batch:
+                raise ValueError(f"Catalog ended with {remaining} {kind} missing.")
+            remaining -= len(batch)
+            yield kind, batch
+
+
+def load_graph(stream=None, storage=None, incremental=False, compact=False):
+    """
+    Build a Graph from a catalog.
+
+    Args:
+        stream: Optional; a text stream to read, standard input by default.
+            Standard input is read as raw bytes in one call.
+        storage: Optional; the edge storage backend for the Graph.
+        incremental: Optional; read the catalog line by line in batches
+            instead of all at once.
+        compact: Optional; keep the vertices in a VertexArray.
+    """
+    stats = _INSTRUMENTATION
+    start = time.perf_counter() if stats is not None else 0.0
+    graph = Graph(storage, compact)
+    num_edges = 0
+    if incremental:
+        for kind, batch in iter_catalog(sys.stdin if stream is None else stream):
+            if kind == "vertices":
+                graph.add_vertices(batch)
+            else:
+                graph.add_edges_by_label(batch)
+                num_edges += len(batch)
+    else:
+        if stream is None:
+            text = sys.stdin.buffer.read().decode()
+        else:
+            text = stream.read()
+        labels, edges = parse_catalog(text)
+        graph.add_vertices(labels)
+        graph.add_edges_by_label(edges)
+        num_edges = len(edges)
+
+    if stats is not None:
+        stats.record(
+            "load",
+            start,
+            vertices_added=len(graph.vertices),
+            edges_added=num_edges,
+            index_lookups=2 * num_edges,
+        )
+    return graph
+
+
+def _capture(flags):
+    """
+    Start the captures main() was asked for with --stats, --profile and
+    --tracemalloc, and return a function that stops them and writes one
+    JSON stats block to standard error.
+    """
+    # pylint: disable=import-outside-toplevel
+    stats = enable_instrumentation()
+    profiler = None
+    if "--profile" in flags:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if "--tracemalloc" in flags:
+        import tracemalloc
+
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    def finish():
+        import json
+
+        block = stats.as_dict()
+        block["total_seconds"] = time.perf_counter() - start
+        if "--tracemalloc" in flags:
+            import tracemalloc
+
+            block["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if profiler is not None:
+            import io
+            import pstats
+
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(15)
+            block["profile"] = report.getvalue().splitlines()
+        disable_instrumentation()
+        sys.stderr.write(json.dumps(block, indent=2) + "\n")
+
+    return finish
 
 
 # WORKS
@@ -376,42 +2868,38 @@ def main():
     """
     The main function to retrieve a registration plan.
     The output code has been written for you.
-    """
-
-    # create a Graph object
-    graph = Graph()
-
-    # read the number of vertices
-    num_vertices = int(input().strip())
 
-    # read the vertices and add them into the graph
-    for _ in range(num_vertices):
-        course_label = input().strip()
-        graph.add_vertex(course_label)
-
-    # read the number of edges
-    num_edges = int(input().strip())
+    Passing --stats, --profile or --tracemalloc writes a JSON block of
+    operation counters and timings (plus a cProfile summary or the peak
+    traced memory) to standard error after the plan is printed. Passing
+    --cycles writes every group of courses that form a cycle to standard
+    error, one group per line, when the plan is invalid.
+    """
+    flags = {"--stats", "--profile", "--tracemalloc"}.intersection(sys.argv[1:])
+    finish = _capture(flags) if flags else None
 
-    # read the edges and insert them into the graph
-    # you will need to call the method to convert them from their labels to their index
-    for _ in range(num_edges):
-        prereq, course = input().strip().split()
-        start_index = graph.get_index(prereq)
-        finish_index = graph.get_index(course)
-        graph.add_edge(start_index, finish_index)
+    # read the whole catalog and build the Graph in bulk
+    graph = load_graph()
 
     ####################################################################################
     # DO NOT CHANGE ANYTHING BELOW THIS
-    if graph.has_cycle():
+    # (the planner detects cycles itself, so the graph is only walked once)
+    courses = graph.try_registration_plan()
+    if courses is None:
         print("Registration plan invalid because a cycle was detected.")
     else:
         print("Valid registration plan detected.")
 
-        courses = graph.get_registration_plan()
         print()
         print("Registration plan: ")
         for semester in courses:
             print(semester)
 
+    if courses is None and "--cycles" in sys.argv[1:]:
+        for group in graph.cycle_groups():
+            sys.stderr.write(" ".join(map(str, group)) + "\n")
+    if finish is not None:
+        finish()
+
 if __name__ == "__main__":
     main()
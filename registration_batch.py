@@ -0,0 +1,315 @@
+"""
+Plan many independent registration graphs in one process launch.
+
+Each input line is a JSON object describing one graph:
+
+    {"id": "student-1", "vertices": ["A", "B"], "edges": [["A", "B"]]}
+
+Each output line is a JSON object with the same id, a status of "valid",
+"cycle" or "invalid", the message main() in registration.py would print,
+and the plan for valid graphs. Results come back in input order.
+
+find_cycle_groups and plan_components use the same worker pool on one very
+large catalog, analyzing or planning its weakly connected components in
+parallel.
+
+With --cache-dir, every worker keeps a PlanCache backed by that directory,
+so graphs with the same edges between the same vertex indices as an
+earlier job are not planned again.
+
+Usage:
+    python3 registration_batch.py jobs.jsonl [--workers N] [--chunksize N]
+        [--cache-dir DIR]
+"""
+
+import argparse
+import functools
+import heapq
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from registration import MAX_COURSES_PER_SEMESTER, Graph, PlanCache
+
+VALID_MESSAGE = "Valid registration plan detected."
+CYCLE_MESSAGE = "Registration plan invalid because a cycle was detected."
+
+# plan_components only starts worker processes for catalogs this large
+PARALLEL_MIN_VERTICES = 20000
+
+
+# one PlanCache per cache directory in every process
+_CACHES = {}
+
+
+def plan_job(line, cache_dir=None):
+    """
+    Plan the graph described by one JSON line.
+
+    Args:
+        line: The JSON job line.
+        cache_dir: Optional; the directory of the PlanCache to plan through.
+
+    Returns:
+        The result object for the job as a dictionary. A job whose edges
+        name a course missing from its vertices is invalid.
+    """
+    job_id = None
+    try:
+        job = json.loads(line)
+        job_id = job.get("id")
+        graph = Graph()
+        graph.add_vertices(job["vertices"])
+        edges = [tuple(edge) for edge in job.get("edges", ())]
+        for edge in edges:
+            if len(edge) != 2:
+                raise ValueError(f"Edge {list(edge)} does not have two courses.")
+            for label in edge:
+                # add_edges_by_label would read an unknown label as the last vertex
+                if not graph.has_vertex(label):
+                    raise ValueError(
+                        f"Edge {list(edge)} names unknown course {label!r}."
+                    )
+        graph.add_edges_by_label(edges)
+    except (ValueError, KeyError, TypeError, AttributeError, IndexError) as error:
+        return {"id": job_id, "status": "invalid", "message": f"Invalid job: {error}"}
+
+    if cache_dir is None:
+        courses = graph.try_registration_plan()
+    else:
+        if cache_dir not in _CACHES:
+            _CACHES[cache_dir] = PlanCache(path=cache_dir)
+        courses = _CACHES[cache_dir].get_plan(graph)
+    if courses is None:
+        return {"id": job_id, "status": "cycle", "message": CYCLE_MESSAGE}
+    return {"id": job_id, "status": "valid", "message": VALID_MESSAGE, "plan": courses}
+
+
+def plan_batch(lines, workers=None, chunksize=64, cache_dir=None):
+    """
+    Plan every job in lines, skipping blank lines.
+
+    Args:
+        lines: An iterable of JSON job lines; it is read lazily.
+        workers: Optional; the number of worker processes, or 1 to plan in
+            this process. Defaults to the number of CPUs.
+        chunksize: Optional; how many jobs to send to a worker at a time.
+        cache_dir: Optional; a directory for the plan caches to share.
+
+    Yields:
+        One result dictionary per job, in input order.
+    """
+    lines = (line for line in lines if line.strip())
+    job = functools.partial(plan_job, cache_dir=cache_dir)
+    if workers == 1:
+        yield from map(job, lines)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Executor.map submits everything it is given up front, so feed it a
+    # bounded window at a time to keep memory flat on huge inputs
+    window = chunksize * workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(itertools.islice(lines, window))
+            if not batch:
+                return
+            yield from executor.map(job, batch, chunksize=chunksize)
+
+
+def _components(graph):
+    """
+    Yield (indices, component) for every weakly connected component of
+    graph, where component is the (labels, edges) tuple the component
+    workers take.
+    """
+    storage = graph.storage
+    labels = graph.labels
+    for indices in graph.weakly_connected_components():
+        local = {i: k for k, i in enumerate(indices)}
+        edges = [(k, local[j]) for i, k in local.items() for j in storage.get_successors(i)]
+        yield indices, ([labels[i] for i in indices], edges)
+
+
+def component_cycle_groups(component):
+    """
+    Find the cycle groups of one component.
+
+    Args:
+        component: A tuple of the component's labels and its edges as
+            (start, finish) index pairs into those labels.
+
+    Returns:
+        The list of groups Graph.cycle_groups returns for the component.
+    """
+    labels, edges = component
+    graph = Graph()
+    graph.add_vertices(labels)
+    graph.add_edges(edges)
+    return graph.cycle_groups()
+
+
+def find_cycle_groups(graph, workers=None, chunksize=16):
+    """
+    Find every group of courses in graph that form a cycle, analyzing its
+    weakly connected components in worker processes. A cycle never spans
+    two of them, so each is searched on its own.
+
+    Args:
+        graph: The Graph to analyze.
+        workers: Optional; the number of worker processes, or 1 to analyze
+            in this process. Defaults to the number of CPUs.
+        chunksize: Optional; how many components to send to a worker at a
+            time.
+
+    Returns:
+        The groups Graph.cycle_groups finds, ordered by the smallest vertex
+        index in each group.
+    """
+    storage = graph.storage
+    labels = graph.labels
+    groups = []
+    components = []
+    for indices, component in _components(graph):
+        if len(indices) > 1:
+            components.append((indices, component))
+        elif storage.has_edge(indices[0], indices[0]):
+            # a single course is only a cycle if it requires itself
+            groups.append((indices[0], [labels[indices[0]]]))
+
+    jobs = [component for _, component in components]
+    if workers == 1:
+        results = map(component_cycle_groups, jobs)
+        return _merge_groups(groups, components, results)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        results = executor.map(component_cycle_groups, jobs, chunksize=chunksize)
+        return _merge_groups(groups, components, results)
+
+
+def _merge_groups(groups, components, results):
+    """Order the groups found in every component by their first vertex."""
+    for (indices, (labels, _)), found in zip(components, results):
+        local = dict(zip(labels, indices))
+        groups.extend((local[group[0]], group) for group in found)
+    groups.sort(key=lambda item: item[0])
+    return [group for _, group in groups]
+
+
+def plan_component(component):
+    """
+    Plan one component.
+
+    Args:
+        component: A tuple of the component's labels and its edges as
+            (start, finish) index pairs into those labels.
+
+    Returns:
+        The plan try_registration_plan returns for the component.
+    """
+    labels, edges = component
+    graph = Graph()
+    graph.add_vertices(labels)
+    graph.add_edges(edges)
+    return graph.try_registration_plan()
+
+
+def merge_plans(plans, cap=MAX_COURSES_PER_SEMESTER):
+    """
+    Merge the plans of independent components into one plan with at most
+    cap courses per semester.
+
+    Each semester is packed greedily: components with the most semesters
+    left go first, and every one hands over as many courses of its current
+    semester as still fit. A component whose semester was only partly taken
+    finishes it in the next semester, and a component only moves on to its
+    next semester in a later semester than the one that completed the last.
+
+    Args:
+        plans: A list of plans, each a list of semesters of at most cap
+            courses.
+        cap: Optional; the number of courses per semester.
+
+    Returns:
+        The merged plan as a 2D list.
+    """
+    # (-semesters left, -courses left, component, semester, courses taken)
+    ready = []
+    for number, plan in enumerate(plans):
+        if plan:
+            courses = sum(len(semester) for semester in plan)
+            ready.append((-len(plan), -courses, number, 0, 0))
+    heapq.heapify(ready)
+
+    merged = []
+    while ready:
+        semester = []
+        waiting = []
+        while ready and len(semester) < cap:
+            left, courses, number, current, taken = heapq.heappop(ready)
+            courses_now = plans[number][current]
+            take = min(cap - len(semester), len(courses_now) - taken)
+            semester.extend(courses_now[taken : taken + take])
+            taken += take
+            courses += take
+            if taken == len(courses_now):
+                left, current, taken = left + 1, current + 1, 0
+            if left:
+                waiting.append((left, courses, number, current, taken))
+        merged.append(semester)
+        for entry in waiting:
+            heapq.heappush(ready, entry)
+    return merged
+
+
+def plan_components(graph, workers=None, chunksize=16):
+    """
+    Plan graph by planning each weakly connected component on its own and
+    merging the plans with merge_plans.
+
+    Args:
+        graph: The Graph to plan.
+        workers: Optional; the number of worker processes, or 1 to plan in
+            this process. Defaults to the number of CPUs for graphs of at
+            least PARALLEL_MIN_VERTICES courses and to 1 for smaller ones.
+        chunksize: Optional; how many components to send to a worker at a
+            time.
+
+    Returns:
+        A plan with at most MAX_COURSES_PER_SEMESTER courses per semester,
+        or None if the prerequisites form a cycle.
+    """
+    jobs = [component for _, component in _components(graph)]
+    if workers is None and len(graph.vertices) < PARALLEL_MIN_VERTICES:
+        workers = 1
+    if workers == 1:
+        plans = list(map(plan_component, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            plans = list(executor.map(plan_component, jobs, chunksize=chunksize))
+    if any(plan is None for plan in plans):
+        return None
+    return merge_plans(plans)
+
+
+def main(argv=None):
+    """Plan the jobs in a JSONL file (or standard input) and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("jobs", nargs="?", default="-", help="JSONL file, - for stdin")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=64)
+    parser.add_argument("--cache-dir")
+    args = parser.parse_args(argv)
+
+    if args.jobs == "-":
+        for result in plan_batch(sys.stdin, args.workers, args.chunksize, args.cache_dir):
+            sys.stdout.write(json.dumps(result) + "\n")
+        return
+    with open(args.jobs, encoding="utf-8") as lines:
+        for result in plan_batch(lines, args.workers, args.chunksize, args.cache_dir):
+            sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
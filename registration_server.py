@@ -0,0 +1,255 @@
+"""
+A long-running planning server that keeps one catalog Graph warm.
+
+The server speaks newline-delimited JSON over localhost TCP or a Unix
+socket. Every request line is an object with an "op":
+
+    {"op": "cycle"}
+    {"op": "plan", "completed": ["M408C"], "targets": ["ME340"]}
+    {"op": "stats"}
+
+"plan" also accepts "priority". Every response line is an object with
+"ok" and either the result or an "error" message. The catalog is only read,
+so concurrent requests share it without copies.
+
+Usage:
+    python3 registration_server.py serve catalog.in [--port 8765 | --unix PATH]
+        [--compiled]
+    python3 registration_server.py loadgen [--port 8765 | --unix PATH]
+        [--connections 8] [--requests 1000] [--request JSON]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+from registration import CycleError, Graph, load_graph
+
+# latencies kept for the percentiles reported by "stats"
+RECENT_LATENCIES = 4096
+
+
+class PlanningServer:
+    """
+    Answers requests against one shared Graph and counts what it did.
+
+    Instance Variables:
+        graph: The catalog Graph every request is planned against.
+        requests: The number of requests answered, per op.
+        errors: The number of requests answered with an error.
+        busy_seconds: Total time spent answering requests.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.started = time.perf_counter()
+        self.requests = collections.Counter()
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        self._recent = collections.deque(maxlen=RECENT_LATENCIES)
+
+    def handle(self, request):
+        """Return the response object for one request object."""
+        op = request.get("op")
+        if op == "cycle":
+            # has_cycle is cached on the graph, find_cycle is not
+            cycle = self.graph.find_cycle() if self.graph.has_cycle() else None
+            return {"ok": True, "cycle": cycle}
+        if op == "plan":
+            for name in ("completed", "targets"):
+                if not isinstance(request.get(name, []), list):
+                    raise ValueError(f"{name} must be a list of courses.")
+            courses = self.graph.try_registration_plan(
+                request.get("priority"),
+                completed=request.get("completed"),
+                targets=request.get("targets"),
+            )
+            if courses is None:
+                raise CycleError(
+                    "Registration plan invalid because a cycle was detected."
+                )
+            return {"ok": True, "plan": courses}
+        if op == "stats":
+            return {"ok": True, "stats": self.stats()}
+        raise ValueError(f"Unknown op: {op!r}")
+
+    def answer(self, line):
+        """
+        Return the response line for one request line, counting it. Every
+        error becomes an error response, so a bad request never costs the
+        client its connection.
+        """
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+            self.requests[request.get("op")] += 1
+            response = self.handle(request)
+        except Exception as error:  # pylint: disable=broad-except
+            self.errors += 1
+            response = {"ok": False, "error": str(error)}
+        latency = time.perf_counter() - start
+        self.busy_seconds += latency
+        self.max_latency = max(self.max_latency, latency)
+        self._recent.append(latency)
+        return json.dumps(response).encode() + b"\n"
+
+    def stats(self):
+        """Return the counters as a dictionary."""
+        uptime = time.perf_counter() - self.started
+        total = sum(self.requests.values())
+        recent = sorted(self._recent)
+
+        def percentile(fraction):
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))]
+
+        return {
+            "requests": total,
+            "by_op": dict(self.requests),
+            "errors": self.errors,
+            "uptime_seconds": uptime,
+            "requests_per_second": total / uptime if uptime else 0.0,
+            "mean_latency_seconds": self.busy_seconds / total if total else 0.0,
+            "p50_latency_seconds": percentile(0.5),
+            "p99_latency_seconds": percentile(0.99),
+            "max_latency_seconds": self.max_latency,
+        }
+
+    async def serve_connection(self, reader, writer):
+        """Answer request lines from one client until it disconnects."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    writer.write(self.answer(line))
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, unix=None):
+        """Start listening and return the asyncio server."""
+        if unix is not None:
+            return await asyncio.start_unix_server(self.serve_connection, unix)
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+
+async def open_connection(host="127.0.0.1", port=8765, unix=None):
+    """Open a client connection to the server."""
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+async def request(reader, writer, message):
+    """Send one request object and return the response object."""
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def load_generator(
+    message, connections=8, requests=1000, host="127.0.0.1", port=8765, unix=None
+):
+    """
+    Send requests copies of message spread over concurrent connections,
+    one request in flight per connection.
+
+    Returns:
+        A dictionary with the number of requests, failures, elapsed seconds,
+        requests per second and client-side latency percentiles.
+    """
+    latencies = []
+    failures = 0
+
+    async def client(count):
+        nonlocal failures
+        reader, writer = await open_connection(host, port, unix)
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await request(reader, writer, message)
+                latencies.append(time.perf_counter() - start)
+                failures += not response.get("ok")
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    shares = [requests // connections] * connections
+    for i in range(requests % connections):
+        shares[i] += 1
+    start = time.perf_counter()
+    await asyncio.gather(*(client(count) for count in shares if count))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_latency_seconds": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p99_latency_seconds": (
+            latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+            if latencies
+            else 0.0
+        ),
+    }
+
+
+async def serve_forever(graph, host, port, unix):
+    """Run the server until interrupted."""
+    server = await PlanningServer(graph).start(host, port, unix)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Run the server or the load generator from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve")
+    serve.add_argument("catalog")
+    serve.add_argument("--compiled", action="store_true")
+    loadgen = commands.add_parser("loadgen")
+    loadgen.add_argument("--connections", type=int, default=8)
+    loadgen.add_argument("--requests", type=int, default=1000)
+    loadgen.add_argument("--request", default='{"op": "plan"}')
+    for command in (serve, loadgen):
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8765)
+        command.add_argument("--unix")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        if args.compiled:
+            graph = Graph.load_compiled(args.catalog)
+        else:
+            with open(args.catalog, encoding="utf-8") as catalog:
+                graph = load_graph(catalog)
+        try:
+            asyncio.run(serve_forever(graph, args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+    else:
+        summary = asyncio.run(
+            load_generator(
+                json.loads(args.request),
+                args.connections,
+                args.requests,
+                args.host,
+                args.port,
+                args.unix,
+            )
+        )
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,56 @@
 """Registration Planning Test Suite"""
 
+import asyncio
+import io
+import json
+import os
+import random
+import signal
+import subprocess
+import tempfile
+import time
 import unittest
 import sys
-from registration import Graph
+from registration import (
+    AdjacencyMatrix,
+    ArrayQueue,
+    ArrayStack,
+    CycleError,
+    Graph,
+    Node,
+    PlanCache,
+    PlanConstraints,
+    QueueError,
+    ReachabilityIndex,
+    StackError,
+    Vertex,
+    dense_storage,
+    disable_instrumentation,
+    enable_instrumentation,
+    iter_catalog,
+    load_graph,
+    validate_plan,
+)
+from registration_batch import find_cycle_groups, merge_plans, plan_batch, plan_components
+from registration_compiled import compile_graph
+import registration_server
+import benchmark_registration
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# modules the command line may import, and its import time budget
+CORE_MODULES = {"heapq", "_heapq", "itertools", "registration"}
+STARTUP_BUDGET_MICROSECONDS = 25000
+
+# seconds the randomized property tests may take per graph size
+PROPERTY_BUDGET_SECONDS = {1000: 2.0, 10000: 5.0, 100000: 30.0}
+# a property test that runs longer than this fails instead of hanging
+PROPERTY_TIMEOUT_SECONDS = 120
 
 
 class TestGetRegistrationPlan(unittest.TestCase):
@@ -131,6 +179,187 @@ class TestGetRegistrationPlan(unittest.TestCase):
         result = graph.get_registration_plan()
         self.check_registration_plan(graph, result)
 
+    def test_get_registration_plan_7(self):
+        """Test that each semester takes the first ready courses in vertex order."""
+        graph = Graph()
+        for label in "ABCDEFG":
+            graph.add_vertex(label)
+        graph.add_edge(0, 1)  # A -> B
+        graph.add_edge(0, 2)  # A -> C
+        result = graph.get_registration_plan()
+        self.check_registration_plan(graph, result)
+        self.assertEqual(result, [["A", "D", "E", "F"], ["B", "C", "G"]])
+
+    def test_get_registration_plan_8(self):
+        """Test get_registration_plan with an edge to an unknown label."""
+        graph = Graph()
+        for label in "ABC":
+            graph.add_vertex(label)
+        graph.add_edge(0, graph.get_index("Z"))  # A -> last vertex
+        self.assertEqual(graph.get_adjacent_vertices(0), [2])
+        result = graph.get_registration_plan()
+        self.check_registration_plan(graph, result)
+
+    def test_get_registration_plan_9(self):
+        """Test priorities and the exact planner on a graph vertex order plans badly."""
+        graph = Graph()
+        for label in "ABCDEFG":
+            graph.add_vertex(label)
+        graph.add_edge(4, 5)  # E -> F
+        graph.add_edge(5, 6)  # F -> G
+        self.assertEqual(len(graph.get_registration_plan()), 4)
+        for priority in ["critical_path", "descendants"]:
+            result = graph.get_registration_plan(priority)
+            self.check_registration_plan(graph, result)
+            self.assertEqual(result[0][0], "E")
+            self.assertEqual(len(result), 3)
+        result = graph.get_optimal_registration_plan()
+        self.check_registration_plan(graph, result)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(graph.critical_path_lengths(), [1, 1, 1, 1, 3, 2, 1])
+        self.assertEqual(graph.descendant_counts(), [0, 0, 0, 0, 2, 1, 0])
+
+    def test_get_registration_plan_10(self):
+        """Test the lazy semester iterator against the list and with a late cycle."""
+        graph = Graph()
+        for label in "ABCDEFG":
+            graph.add_vertex(label)
+        graph.add_edge(0, 5)  # A -> F
+        graph.add_edge(5, 6)  # F -> G
+        graph.add_edge(6, 5)  # G -> F
+        semesters = graph.iter_registration_plan()
+        self.assertEqual(next(semesters), ["A", "B", "C", "D"])
+        self.assertEqual(next(semesters), ["E"])
+        with self.assertRaises(CycleError):
+            next(semesters)
+        self.assertIsNone(graph.try_registration_plan())
+
+        graph.remove_edge(6, 5)
+        for priority in [None, "critical_path"]:
+            semesters = list(graph.iter_registration_plan(priority))
+            self.assertEqual(semesters, graph.get_registration_plan(priority))
+        first = next(graph.iter_registration_plan(targets=["G"]))
+        self.assertEqual(first, ["A"])
+
+    def test_get_registration_plan_11(self):
+        """Test that alternative plans come best first, distinct and valid."""
+        graph = Graph()
+        for label in "ABCDEF":
+            graph.add_vertex(label)
+        graph.add_edge(0, 5)  # A -> F
+        plans = graph.get_alternative_plans(20)
+        self.assertEqual(len(plans), 5)
+        self.assertEqual(len({str(plan) for plan in plans}), 5)
+        for plan in plans:
+            self.check_registration_plan(graph, plan)
+        self.assertEqual([len(plan) for plan in plans], [2, 2, 2, 2, 3])
+        self.assertEqual(plans[4], [["B", "C", "D", "E"], ["A"], ["F"]])
+        heavy_e = [1, 1, 1, 1, 5, 1]
+        self.assertEqual(
+            graph.get_alternative_plans(1, heavy_e), [[["A", "B", "C", "E"], ["D", "F"]]]
+        )
+        with self.assertRaises(ValueError):
+            graph.get_alternative_plans(1, max_vertices=5)
+
+    def test_get_registration_plan_12(self):
+        """Test that unknown priorities and short score lists are rejected."""
+        graph = Graph()
+        for label in "ABC":
+            graph.add_vertex(label)
+        for priority in ["bogus", [1], [1, 2, 3, 4]]:
+            with self.assertRaises(ValueError):
+                graph.get_registration_plan(priority)
+        self.assertEqual(graph.get_registration_plan([1, 2, 3]), [["C", "B", "A"]])
+
+
+class TestConstraints(unittest.TestCase):
+    """Constrained planning Test Suite"""
+
+    def build(self):
+        """Build A -> C, B -> C, C -> D next to independent E and F."""
+        graph = Graph()
+        for label in "ABCDEF":
+            graph.add_vertex(label)
+        graph.add_edge(0, 2)  # A -> C
+        graph.add_edge(1, 2)  # B -> C
+        graph.add_edge(2, 3)  # C -> D
+        return graph
+
+    def test_constraints_1(self):
+        """Test that the default constraints match the four course plan."""
+        graph = self.build()
+        self.assertEqual(
+            graph.get_registration_plan(constraints=PlanConstraints()),
+            graph.get_registration_plan(),
+        )
+
+    def test_constraints_2(self):
+        """Test credit hours, per-term capacity and offerings."""
+        graph = self.build()
+        constraints = PlanConstraints(
+            capacity=lambda semester: 6 if semester % 3 == 2 else 9,
+            weights={"A": 4, "B": 4, "C": 3, "E": 3},
+            offerings={"C": ["spring"], "F": ["summer"]},
+            terms=("fall", "spring", "summer"),
+        )
+        self.assertEqual(
+            graph.get_registration_plan(constraints=constraints),
+            [["A", "B"], ["C", "E"], ["D", "F"]],
+        )
+
+    def test_constraints_3(self):
+        """Test that impossible constraints and cycles are reported."""
+        graph = self.build()
+        with self.assertRaises(ValueError):
+            graph.get_registration_plan(constraints=PlanConstraints(weights={"E": 5}))
+        with self.assertRaises(ValueError):
+            graph.get_registration_plan(
+                constraints=PlanConstraints(offerings={"A": ["winter"]})
+            )
+        graph.add_edge(3, 0)  # D -> A (Cycle)
+        self.assertIsNone(graph.try_registration_plan(constraints=PlanConstraints()))
+
+    def test_constraints_4(self):
+        """Test that courses too heavy for the room left do not slow planning down."""
+        # 8000 weight-3 courses and one weight-1 course under a capacity of
+        # 10 leave one unit of room in every semester; setting the heavy
+        # courses aside and back once per semester took seconds
+        graph = Graph()
+        labels = [f"C{i}" for i in range(8000)] + ["L"]
+        graph.add_vertices(labels)
+        constraints = PlanConstraints(10, {label: 3 for label in labels[:-1]})
+        start = time.perf_counter()
+        courses = graph.get_registration_plan(constraints=constraints)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(courses), 2667)
+        self.assertEqual(courses[0], ["C0", "C1", "C2", "L"])
+
+
+class TestTranscript(unittest.TestCase):
+    """Plan-from-transcript Test Suite"""
+
+    def test_transcript_1(self):
+        """Test planning only the missing prerequisites of a target."""
+        with open(os.path.join(HERE, "registration.in"), encoding="utf-8") as file:
+            graph = load_graph(file)
+        result = graph.get_registration_plan(completed=["m", "n"], targets=["t"])
+        self.assertEqual(result, [["p", "q"], ["o"], ["s"], ["r"], ["u"], ["t"]])
+        # the shared graph is unchanged and still plans everything
+        self.assertEqual(len(graph.get_registration_plan()), 8)
+
+    def test_transcript_2(self):
+        """Test completed courses without targets, and unknown labels."""
+        graph = Graph()
+        for label in "ABC":
+            graph.add_vertex(label)
+        graph.add_edge(0, 1)  # A -> B
+        graph.add_edge(1, 2)  # B -> C
+        self.assertEqual(graph.get_registration_plan(completed=["A"]), [["B"], ["C"]])
+        self.assertEqual(graph.get_registration_plan(targets=["A"]), [["A"]])
+        self.assertEqual(graph.get_registration_plan(completed=["A", "B", "C"]), [])
+        with self.assertRaises(ValueError):
+            graph.get_registration_plan(targets=["Z"])
+
 
 class TestHasCycle(unittest.TestCase):
     """has_cycle Test Suite"""
@@ -166,6 +395,804 @@ class TestHasCycle(unittest.TestCase):
         graph.add_edge(4, 0)  # 4 -> 0 (Cycle)
         self.assertTrue(graph.has_cycle())
 
+    def test_has_cycle_4(self):
+        """Test has_cycle on a 20000 vertex chain, deeper than the recursion limit."""
+        graph = Graph()
+        for i in range(20000):
+            graph.add_vertex(str(i))
+        for i in range(19999):
+            graph.add_edge(i, i + 1)
+        self.assertFalse(graph.has_cycle())
+        graph.add_edge(19999, 0)
+        self.assertTrue(graph.has_cycle())
+
+    def test_has_cycle_5(self):
+        """Test that find_cycle reports the labels along the cycle."""
+        graph = Graph()
+        for label in "ABCDE":
+            graph.add_vertex(label)
+        graph.add_edge(0, 1)  # A -> B
+        graph.add_edge(1, 2)  # B -> C
+        graph.add_edge(2, 3)  # C -> D
+        graph.add_edge(3, 1)  # D -> B (Cycle)
+        graph.add_edge(3, 4)  # D -> E
+        self.assertEqual(graph.find_cycle(), ["B", "C", "D", "B"])
+        self.assertIsNone(graph.try_registration_plan())
+        with self.assertRaises(CycleError):
+            graph.get_registration_plan()
+
+
+class TestContainers(unittest.TestCase):
+    """Array-backed Stack and Queue Test Suite"""
+
+    def test_containers_1(self):
+        """Test ArrayStack errors, bulk extend and drain."""
+        stack = ArrayStack()
+        with self.assertRaisesRegex(StackError, "Peek from empty stack."):
+            stack.peek()
+        with self.assertRaisesRegex(StackError, "Pop from empty stack."):
+            stack.pop()
+        stack.push(1)
+        stack.extend([2, 3])
+        self.assertEqual((stack.peek(), stack.size()), (3, 3))
+        self.assertEqual(stack.pop(), 3)
+        self.assertEqual(stack.drain(), [2, 1])
+        self.assertTrue(stack.is_empty())
+
+    def test_containers_2(self):
+        """Test ArrayQueue errors, wraparound, growth and shrinking."""
+        queue = ArrayQueue()
+        with self.assertRaisesRegex(QueueError, "Peek from empty queue."):
+            queue.peek()
+        with self.assertRaisesRegex(QueueError, "Dequeue from empty queue."):
+            queue.dequeue()
+        # wrap around the buffer, grow it, then shrink it again
+        for item in range(6):
+            queue.enqueue(item)
+        self.assertEqual([queue.dequeue() for _ in range(5)], [0, 1, 2, 3, 4])
+        queue.extend(range(6, 40))
+        self.assertEqual((queue.peek(), queue.size()), (5, 35))
+        self.assertEqual([queue.dequeue() for _ in range(30)], list(range(5, 35)))
+        self.assertEqual(len(queue._items), 16)  # pylint: disable=protected-access
+        self.assertEqual(queue.drain(), list(range(35, 40)))
+        self.assertTrue(queue.is_empty())
+
+
+class TestPlanCache(unittest.TestCase):
+    """Fingerprinted plan cache Test Suite"""
+
+    def build(self, labels, edges):
+        """Build a graph from labels and (prereq, course) label pairs."""
+        graph = Graph()
+        graph.add_vertices(labels)
+        graph.add_edges_by_label(edges)
+        return graph
+
+    def test_plan_cache_1(self):
+        """Test fingerprints and in-memory hits across relabeled graphs."""
+        first = self.build("ABC", [("A", "C"), ("B", "C")])
+        same = self.build("ABC", [("B", "C"), ("A", "C")])
+        relabeled = self.build("XYZ", [("X", "Z"), ("Y", "Z")])
+        self.assertEqual(first.fingerprint(), same.fingerprint())
+        self.assertNotEqual(first.fingerprint(), relabeled.fingerprint())
+        self.assertEqual(
+            first.fingerprint(structure_only=True),
+            relabeled.fingerprint(structure_only=True),
+        )
+        reordered = self.build("CAB", [("A", "C"), ("B", "C")])
+        self.assertNotEqual(
+            first.fingerprint(structure_only=True),
+            reordered.fingerprint(structure_only=True),
+        )
+
+        cache = PlanCache(maxsize=2)
+        self.assertEqual(cache.get_plan(first), [["A", "B"], ["C"]])
+        self.assertEqual(cache.get_plan(relabeled), [["X", "Y"], ["Z"]])
+        self.assertTrue(cache.has_cycle(self.build("AB", [("A", "B"), ("B", "A")])))
+        self.assertFalse(cache.has_cycle(self.build("PQ", [])))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 3, 2))
+
+    def test_plan_cache_2(self):
+        """Test the directory tier and batch planning through it."""
+        graph = self.build("ABC", [("A", "B"), ("B", "C")])
+        with tempfile.TemporaryDirectory() as path:
+            self.assertEqual(PlanCache(path=path).get_plan(graph), [["A"], ["B"], ["C"]])
+            cache = PlanCache(path=path)
+            self.assertEqual(cache.get_plan(graph), [["A"], ["B"], ["C"]])
+            self.assertEqual(cache.get_plan(graph), [["A"], ["B"], ["C"]])
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+            self.assertEqual(cache.stats()["hits"], 1)
+            jobs = TestBatch.JOBS * 2
+            self.assertEqual(
+                list(plan_batch(jobs, workers=1, cache_dir=path)),
+                list(plan_batch(jobs, workers=1)),
+            )
+
+
+class TestComponents(unittest.TestCase):
+    """Strongly and weakly connected components Test Suite"""
+
+    def build(self):
+        """Build cycles A <-> B and C -> D -> E -> C, with A -> C and F alone."""
+        graph = Graph()
+        graph.add_vertices(["A", "B", "C", "D", "E", "F"])
+        graph.add_edges_by_label(
+            [("A", "B"), ("B", "A"), ("A", "C"), ("C", "D"), ("D", "E"), ("E", "C")]
+        )
+        return graph
+
+    def test_components_1(self):
+        """Test strongly and weakly connected components and cycle groups."""
+        graph = self.build()
+        self.assertEqual(
+            graph.strongly_connected_components(), [[5], [0, 1], [2, 3, 4]]
+        )
+        self.assertEqual(graph.cycle_groups(), [["A", "B"], ["C", "D", "E"]])
+        self.assertEqual(graph.weakly_connected_components(), [[0, 1, 2, 3, 4], [5]])
+
+    def test_components_2(self):
+        """Test that the condensed graph plans whole components."""
+        dag, component_of = self.build().condensation()
+        self.assertEqual(component_of, [1, 1, 2, 2, 2, 0])
+        self.assertEqual(
+            dag.get_registration_plan(), [[("F",), ("A", "B")], [("C", "D", "E")]]
+        )
+
+    def test_components_3(self):
+        """Test self-loops and parallel cycle analysis by component."""
+        graph = self.build()
+        graph.add_vertex("G")
+        graph.add_edge(6, 6)
+        expected = [["A", "B"], ["C", "D", "E"], ["G"]]
+        self.assertEqual(graph.cycle_groups(), [["G"]] + expected[:2])
+        self.assertEqual(find_cycle_groups(graph, workers=1), expected)
+        self.assertEqual(find_cycle_groups(graph, workers=2, chunksize=1), expected)
+
+
+class TestStorage(unittest.TestCase):
+    """Graph storage backend Test Suite"""
+
+    def build(self, storage=None):
+        """Build the same small catalog on the given storage."""
+        graph = Graph(storage)
+        for label in "ABCDE":
+            graph.add_vertex(label)
+        graph.add_edge(0, 2)  # A -> C
+        graph.add_edge(1, 2)  # B -> C
+        graph.add_edge(2, 4)  # C -> E
+        graph.add_edge(2, 4)  # duplicate edge
+        return graph
+
+    def test_storage_1(self):
+        """Test that sparse and dense storage agree on adjacency."""
+        sparse, dense = self.build(), self.build(AdjacencyMatrix())
+        self.assertEqual(sparse.adjacency_matrix, dense.adjacency_matrix)
+        for i in range(5):
+            self.assertEqual(
+                sparse.get_adjacent_vertices(i), dense.get_adjacent_vertices(i)
+            )
+
+    def test_storage_2(self):
+        """Test that sparse and dense storage produce the same plan."""
+        sparse, dense = self.build(), self.build(AdjacencyMatrix())
+        self.assertEqual(
+            sparse.get_registration_plan(), dense.get_registration_plan()
+        )
+        dense.add_edge(4, 0)  # E -> A (Cycle)
+        self.assertTrue(dense.has_cycle())
+
+    def test_storage_3(self):
+        """Test that dense_storage plans like the sparse default, with or without NumPy."""
+        sparse, dense = self.build(), self.build(dense_storage())
+        self.assertEqual(sparse.adjacency_matrix, dense.adjacency_matrix)
+        self.assertEqual(
+            sparse.get_registration_plan(), dense.get_registration_plan()
+        )
+        self.assertEqual(sparse.topological_order(), dense.topological_order())
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_storage_4(self):
+        """Test the vectorized planner and cycle check on a dense web."""
+        sparse, dense = Graph(), Graph(dense_storage())
+        for graph in (sparse, dense):
+            for i in range(60):
+                graph.add_vertex(str(i))
+            for i in range(60):
+                for j in range(i + 1, 60, 1 + i % 3):
+                    graph.add_edge(i, j)
+        self.assertTrue(dense.storage.vectorized)
+        self.assertEqual(
+            sparse.get_registration_plan(), dense.get_registration_plan()
+        )
+        dense.remove_vertex("30")
+        sparse.remove_vertex("30")
+        self.assertEqual(sparse.adjacency_matrix, dense.adjacency_matrix)
+        dense.add_edge(59 - 1, 0)
+        self.assertTrue(dense.has_cycle())
+        self.assertIsNone(dense.try_registration_plan())
+        # 59 is past the last vertex but inside the array's spare rows
+        with self.assertRaises(IndexError):
+            dense.storage.add_edge(0, 59)
+        with self.assertRaises(IndexError):
+            dense.storage.has_edge(59, 0)
+
+    def test_storage_5(self):
+        """Test that adjacency_matrix is a live, read-only view."""
+        for graph in (Graph(), Graph(AdjacencyMatrix())):
+            graph.add_vertex("A")
+            graph.add_vertex("B")
+            matrix = graph.adjacency_matrix
+            graph.add_edge(0, 1)
+            self.assertEqual((matrix[0][1], matrix[-1][0], len(matrix[0])), (1, 0, 2))
+            self.assertEqual(matrix, [[0, 1], [0, 0]])
+            with self.assertRaises(TypeError):
+                matrix[1][0] = 1
+            copy = matrix.tolist()
+            copy[1][0] = 1
+            self.assertEqual(matrix[1][0], 0)
+            self.assertFalse(graph.has_cycle())
+
+
+class TestIndex(unittest.TestCase):
+    """Label index Test Suite"""
+
+    def test_index_1(self):
+        """Test get_index and has_vertex, including duplicate labels."""
+        graph = Graph()
+        for label in ["M408C", "M408D", "M408C", "PHY303K"]:
+            graph.add_vertex(label)
+        self.assertEqual(len(graph.vertices), 3)
+        self.assertEqual(graph.get_index("M408D"), 1)
+        self.assertEqual(graph.get_index("PHY303K"), 2)
+        self.assertEqual(graph.get_index("CS314"), -1)
+        self.assertTrue(graph.has_vertex("M408C"))
+        self.assertFalse(graph.has_vertex("CS314"))
+
+    def test_index_2(self):
+        """Test that reindex follows vertices shifted by a removal."""
+        graph = Graph()
+        for label in "ABCD":
+            graph.add_vertex(label)
+        graph.vertices.pop(1)
+        del graph.index["B"]
+        graph.reindex(1)
+        self.assertEqual([graph.get_index(label) for label in "ACD"], [0, 1, 2])
+
+
+class TestCompact(unittest.TestCase):
+    """Compact vertex representation Test Suite"""
+
+    def test_compact_1(self):
+        """Test that Node and Vertex have no per-instance __dict__."""
+        self.assertFalse(hasattr(Node(1), "__dict__"))
+        vertex = Vertex("A")
+        self.assertFalse(hasattr(vertex, "__dict__"))
+        vertex.visited = True
+        self.assertTrue(vertex.visited)
+        with self.assertRaises(ValueError):
+            vertex.visited = 1
+
+    def test_compact_2(self):
+        """Test that a compact graph plans like a regular one."""
+        regular, compact = Graph(), Graph(compact=True)
+        for graph in (regular, compact):
+            for label in "ABCDEF":
+                graph.add_vertex(label)
+            graph.add_edges([(0, 3), (1, 3), (3, 5), (2, 4)])
+        self.assertEqual(
+            regular.get_registration_plan(), compact.get_registration_plan()
+        )
+        self.assertEqual([vertex.label for vertex in compact.vertices], list("ABCDEF"))
+        compact.vertices[2].visited = True
+        self.assertEqual(compact.vertices.visited, bytearray([0, 0, 1, 0, 0, 0]))
+        compact.vertices.reset_visited()
+        self.assertFalse(compact.vertices[-4].visited)
+
+
+class TestIncremental(unittest.TestCase):
+    """Incremental plan maintenance Test Suite"""
+
+    def rebuild(self, graph):
+        """Return a fresh copy of graph with nothing cached."""
+        copy = Graph()
+        copy.add_vertices(graph.labels)
+        for i in range(len(graph.vertices)):
+            for j in graph.get_adjacent_vertices(i):
+                copy.add_edge(i, j)
+        return copy
+
+    def build(self):
+        """Build a planned chain A -> B -> C next to independent courses."""
+        graph = Graph()
+        for label in "ABCDEFG":
+            graph.add_vertex(label)
+        graph.add_edge(0, 1)  # A -> B
+        graph.add_edge(1, 2)  # B -> C
+        graph.get_registration_plan()
+        return graph
+
+    def test_incremental_1(self):
+        """Test that edge edits keep the cached plan equal to a fresh plan."""
+        graph = self.build()
+        graph.add_edge(3, 0)  # D -> A
+        self.assertEqual(
+            graph.get_registration_plan(), self.rebuild(graph).get_registration_plan()
+        )
+        graph.remove_edge(0, 1)  # A -> B
+        self.assertEqual(
+            graph.get_registration_plan(), self.rebuild(graph).get_registration_plan()
+        )
+        self.assertFalse(graph.has_cycle())
+
+    def test_incremental_2(self):
+        """Test that an edge closing a cycle is caught, and removing it recovers."""
+        graph = self.build()
+        graph.add_edge(2, 0)  # C -> A (Cycle)
+        self.assertTrue(graph.has_cycle())
+        self.assertIsNone(graph.try_registration_plan())
+        graph.remove_edge(2, 0)
+        self.assertFalse(graph.has_cycle())
+        self.assertEqual(
+            graph.get_registration_plan(), self.rebuild(graph).get_registration_plan()
+        )
+
+    def test_incremental_3(self):
+        """Test adding and removing vertices after planning."""
+        graph = self.build()
+        graph.add_vertex("H")
+        graph.add_edge(graph.get_index("H"), 2)  # H -> C
+        self.assertEqual(
+            graph.get_registration_plan(), self.rebuild(graph).get_registration_plan()
+        )
+        graph.remove_vertex("B")
+        self.assertEqual(graph.get_index("C"), 1)
+        self.assertEqual(graph.get_adjacent_vertices(6), [1])
+        self.assertEqual(
+            graph.get_registration_plan(), self.rebuild(graph).get_registration_plan()
+        )
+
+
+class TestReachability(unittest.TestCase):
+    """Prerequisite query Test Suite"""
+
+    def build(self):
+        """Build A -> B -> D, A -> C, E."""
+        graph = Graph()
+        for label in "ABCDE":
+            graph.add_vertex(label)
+        graph.add_edge(0, 1)  # A -> B
+        graph.add_edge(1, 3)  # B -> D
+        graph.add_edge(0, 2)  # A -> C
+        return graph
+
+    def test_reachability_1(self):
+        """Test prerequisite queries, and that edits invalidate them."""
+        graph = self.build()
+        self.assertTrue(graph.is_prerequisite("A", "D"))
+        self.assertFalse(graph.is_prerequisite("C", "D"))
+        self.assertEqual(graph.get_prerequisites("D"), ["A", "B"])
+        self.assertEqual(graph.get_dependents("A"), ["B", "C", "D"])
+        graph.add_edge(4, 0)  # E -> A
+        self.assertTrue(graph.is_prerequisite("E", "D"))
+        graph.remove_edge(1, 3)  # B -> D
+        self.assertEqual(graph.get_prerequisites("D"), [])
+        with self.assertRaises(ValueError):
+            graph.get_dependents("Z")
+
+    def test_reachability_2(self):
+        """Test that per-query search agrees with the closure and uses the LRU cache."""
+        graph = self.build()
+        graph.add_edge(3, 0)  # D -> A (Cycle)
+        closure = ReachabilityIndex(self.build())
+        search = ReachabilityIndex(self.build(), closure_limit=0, cache_size=2)
+        for i in range(5):
+            self.assertEqual(closure.descendant_bits(i), search.descendant_bits(i))
+            self.assertEqual(closure.ancestor_bits(i), search.ancestor_bits(i))
+        search.descendant_bits(4)
+        self.assertEqual((search.hits, search.misses), (1, 10))
+        self.assertTrue(graph.is_prerequisite("D", "D"))
+
+
+class TestLoader(unittest.TestCase):
+    """Catalog loader Test Suite"""
+
+    def read(self, name):
+        """Return the text of a catalog file next to this test file."""
+        with open(os.path.join(HERE, name), encoding="utf-8") as file:
+            return file.read()
+
+    def test_loader_1(self):
+        """Test that bulk and incremental loading build the same graph."""
+        text = self.read("registration.in")
+        bulk = load_graph(io.StringIO(text))
+        incremental = load_graph(io.StringIO(text), incremental=True)
+        self.assertEqual(len(bulk.vertices), 14)
+        self.assertEqual(bulk.adjacency_matrix, incremental.adjacency_matrix)
+        self.assertEqual(
+            bulk.get_registration_plan(), incremental.get_registration_plan()
+        )
+        self.assertEqual(bulk.get_registration_plan()[2:4], [["s"], ["r"]])
+
+    def test_loader_2(self):
+        """Test that iter_catalog yields bounded batches."""
+        text = "3\nA\nB\nC\n2\nA B\nB C\n"
+        batches = list(iter_catalog(io.StringIO(text), batch_size=2))
+        self.assertEqual(
+            batches,
+            [
+                ("vertices", ["A", "B"]),
+                ("vertices", ["C"]),
+                ("edges", [("A", "B"), ("B", "C")]),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            list(iter_catalog(io.StringIO("3\nA\n")))
+
+    def test_loader_3(self):
+        """Test that both loaders reject malformed and truncated catalogs."""
+        for text in (
+            "3\nA\nB\nC\n2\nA B C\nB C\n",
+            "3\nA\nB\nC\n2\nA B\n",
+            "3\nA\nB\n",
+            "3\nA\nB\nC\n",
+        ):
+            for incremental in (False, True):
+                with self.assertRaises(ValueError):
+                    load_graph(io.StringIO(text), incremental=incremental)
+
+
+class TestCompiled(unittest.TestCase):
+    """Compiled catalog Test Suite"""
+
+    def test_compiled_1(self):
+        """Test that a compiled catalog loads back into an equivalent graph."""
+        with open(os.path.join(HERE, "test_1.in"), encoding="utf-8") as file:
+            graph = load_graph(file)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.bin")
+            compile_graph(graph, path)
+            loaded = Graph.load_compiled(path)
+            self.assertEqual(loaded.labels, graph.labels)
+            self.assertEqual(loaded.get_index("ME340"), graph.get_index("ME340"))
+            self.assertEqual(loaded.adjacency_matrix, graph.adjacency_matrix)
+            self.assertEqual(
+                loaded.get_registration_plan(), graph.get_registration_plan()
+            )
+            with self.assertRaises(TypeError):
+                loaded.add_vertex("CS314")
+            self.assertFalse(loaded.has_vertex("CS314"))
+            loaded.storage.close()
+
+    def test_compiled_2(self):
+        """Test that cyclic graphs and foreign files are rejected."""
+        graph = Graph()
+        graph.add_vertex("A")
+        graph.add_edge(0, 0)  # A -> A (Cycle)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.bin")
+            with self.assertRaises(CycleError):
+                compile_graph(graph, path)
+            with open(path, "wb") as file:
+                file.write(b"not a catalog at all")
+            with self.assertRaises(ValueError):
+                Graph.load_compiled(path)
+
+
+class TestBatch(unittest.TestCase):
+    """Batch planning Test Suite"""
+
+    JOBS = [
+        json.dumps({"id": 1, "vertices": ["A", "B", "C"], "edges": [["A", "B"]]}),
+        json.dumps({"id": 2, "vertices": ["A", "B"], "edges": [["A", "B"], ["B", "A"]]}),
+        "not json",
+        json.dumps({"id": 4, "vertices": ["X"]}),
+    ]
+
+    def test_batch_1(self):
+        """Test statuses and input order when planning in this process."""
+        results = list(plan_batch(self.JOBS, workers=1))
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["valid", "cycle", "invalid", "valid"],
+        )
+        self.assertEqual(results[0]["plan"], [["A", "C"], ["B"]])
+        self.assertEqual(
+            results[1]["message"],
+            "Registration plan invalid because a cycle was detected.",
+        )
+        self.assertEqual(results[3]["id"], 4)
+
+    def test_batch_2(self):
+        """Test that a process pool returns the same results in order."""
+        self.assertEqual(
+            list(plan_batch(self.JOBS * 5, workers=2, chunksize=3)),
+            list(plan_batch(self.JOBS * 5, workers=1)),
+        )
+
+    def test_batch_3(self):
+        """Test merging component plans under the four course cap."""
+        self.assertEqual(
+            merge_plans([[["A"], ["B"], ["C"]], [["D", "E", "F"]], [["G", "H"]]]),
+            [["A", "D", "E", "F"], ["B", "G", "H"], ["C"]],
+        )
+        self.assertEqual(merge_plans([]), [])
+
+    def test_batch_4(self):
+        """Test planning components in this process and in a process pool."""
+        with open(os.path.join(HERE, "registration.in"), encoding="utf-8") as catalog:
+            graph = load_graph(catalog)
+        graph.add_vertices(["X1", "X2", "X3"])
+        graph.add_edges_by_label([("X1", "X2"), ("X2", "X3")])
+        plan = plan_components(graph, workers=1)
+        self.assertEqual(plan, graph.get_registration_plan())
+        self.assertEqual(plan_components(graph, workers=2), plan)
+        graph.add_edges_by_label([("X3", "X1")])
+        self.assertIsNone(plan_components(graph, workers=1))
+
+    def test_batch_5(self):
+        """Test that edges naming unknown courses make a job invalid."""
+        jobs = [
+            json.dumps({"id": 5, "vertices": ["A", "B"], "edges": [["A", "Z"]]}),
+            json.dumps({"id": 6, "vertices": [], "edges": [["A", "B"]]}),
+            json.dumps({"id": 7, "vertices": ["A", "B"], "edges": [["A", "B", "C"]]}),
+            json.dumps({"id": 8, "vertices": ["A"], "edges": [[["A"], "A"]]}),
+        ]
+        results = list(plan_batch(jobs, workers=1))
+        self.assertEqual([result["status"] for result in results], ["invalid"] * 4)
+        self.assertEqual([result["id"] for result in results], [5, 6, 7, 8])
+        self.assertIn("'Z'", results[0]["message"])
+
+
+class TestServer(unittest.TestCase):
+    """Planning server Test Suite"""
+
+    def test_server_1(self):
+        """Test plan, cycle and stats requests and the load generator."""
+        graph = Graph()
+        for label in "ABC":
+            graph.add_vertex(label)
+        graph.add_edge(0, 1)  # A -> B
+
+        async def scenario():
+            planner = registration_server.PlanningServer(graph)
+            server = await planner.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await registration_server.open_connection(port=port)
+            plan = await registration_server.request(
+                reader, writer, {"op": "plan", "targets": ["B"]}
+            )
+            cycle = await registration_server.request(reader, writer, {"op": "cycle"})
+            bad = await registration_server.request(reader, writer, {"op": "nope"})
+            summary = await registration_server.load_generator(
+                {"op": "plan"}, connections=3, requests=20, port=port
+            )
+            stats = await registration_server.request(reader, writer, {"op": "stats"})
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+            return plan, cycle, bad, summary, stats
+
+        plan, cycle, bad, summary, stats = asyncio.run(scenario())
+        self.assertEqual(plan, {"ok": True, "plan": [["A"], ["B"]]})
+        self.assertEqual(cycle, {"ok": True, "cycle": None})
+        self.assertFalse(bad["ok"])
+        self.assertEqual((summary["requests"], summary["failures"]), (20, 0))
+        self.assertEqual(stats["stats"]["by_op"]["plan"], 21)
+        self.assertEqual(stats["stats"]["errors"], 1)
+
+    def test_server_2(self):
+        """Test that bad plan requests get error responses instead of a crash."""
+        graph = Graph()
+        for label in "ABC":
+            graph.add_vertex(label)
+        planner = registration_server.PlanningServer(graph)
+        for request in (
+            {"op": "plan", "priority": [1]},
+            {"op": "plan", "priority": "bogus"},
+            {"op": "plan", "completed": "AB"},
+            {"op": "plan", "targets": "C"},
+            {"op": ["plan"]},
+        ):
+            response = json.loads(planner.answer(json.dumps(request)))
+            self.assertFalse(response["ok"])
+        self.assertEqual(planner.errors, 5)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Instrumentation Test Suite"""
+
+    def tearDown(self):
+        """Leave instrumentation disabled for the other tests."""
+        disable_instrumentation()
+
+    def test_instrumentation_1(self):
+        """Test the counters recorded while loading and planning a catalog."""
+        stats = enable_instrumentation()
+        with open(os.path.join(HERE, "registration.in"), encoding="utf-8") as catalog:
+            graph = load_graph(catalog)
+        graph.try_registration_plan()
+        graph.adjacency_matrix.tolist()
+        self.assertIs(disable_instrumentation(), stats)
+        self.assertEqual(stats.calls["load"], 1)
+        self.assertEqual(stats.counters["vertices_added"], 14)
+        self.assertEqual(stats.counters["edges_added"], 21)
+        self.assertEqual(stats.counters["edges_scanned"], 21)
+        self.assertEqual(stats.counters["semesters_produced"], 8)
+        self.assertEqual(stats.counters["matrix_copies"], 1)
+        self.assertEqual(set(stats.as_dict()), {"counters", "timings_seconds", "calls"})
+
+    def test_instrumentation_2(self):
+        """Test that planning works and records nothing when disabled."""
+        graph = Graph()
+        graph.add_vertices(["A", "B"])
+        graph.add_edges_by_label([("A", "B")])
+        self.assertIsNone(disable_instrumentation())
+        self.assertEqual(graph.get_registration_plan(), [["A"], ["B"]])
+
+
+class TestProperties(unittest.TestCase):
+    """Randomized planner property Test Suite"""
+
+    def setUp(self):
+        """Fail a test that outlives PROPERTY_TIMEOUT_SECONDS, where alarms exist."""
+        if hasattr(signal, "SIGALRM"):
+            signal.signal(signal.SIGALRM, self.time_out)
+            signal.alarm(PROPERTY_TIMEOUT_SECONDS)
+
+    def tearDown(self):
+        """Cancel the timeout alarm."""
+        if hasattr(signal, "SIGALRM"):
+            signal.alarm(0)
+
+    def time_out(self, signum, frame):
+        """Fail the running test from the alarm handler."""
+        self.fail(f"Property test took more than {PROPERTY_TIMEOUT_SECONDS} seconds.")
+
+    @staticmethod
+    def random_catalog(rng, num_vertices, cyclic):
+        """
+        Return labels and (prereq, course) index pairs of a random catalog
+        whose shape, vertex order and edge order are shuffled. A cyclic
+        catalog gets one edge reversed, which closes a loop.
+        """
+        shape = rng.choice(sorted(benchmark_registration.SHAPES))
+        if shape == "dense":
+            num_vertices = min(num_vertices, 300)
+        edges = benchmark_registration.SHAPES[shape](num_vertices, rng.randrange(1000))
+        order = list(range(num_vertices))
+        rng.shuffle(order)
+        edges = [(order[start], order[finish]) for start, finish in edges]
+        rng.shuffle(edges)
+        if cyclic and edges:
+            start, finish = edges[0]
+            edges.append((finish, start))
+        labels = [f"C{i}" for i in range(num_vertices)]
+        return labels, edges, cyclic and bool(edges)
+
+    def check_catalogs(self, num_vertices, count, seed):
+        """Plan count random catalogs and check every answer."""
+        rng = random.Random(seed)
+        for _ in range(count):
+            labels, edges, cyclic = self.random_catalog(rng, num_vertices, rng.random() < 0.3)
+            graph = Graph()
+            graph.add_vertices(labels)
+            graph.add_edges(edges)
+            self.assertEqual(graph.has_cycle(), cyclic)
+            if cyclic:
+                cycle = graph.find_cycle()
+                for start, finish in zip(cycle, cycle[1:]):
+                    self.assertTrue(
+                        graph.storage.has_edge(graph.index[start], graph.index[finish])
+                    )
+                with self.assertRaises(CycleError):
+                    graph.get_registration_plan()
+            else:
+                validate_plan(labels, edges, graph.get_registration_plan())
+
+    def test_properties_1(self):
+        """Test the validator on plans that break each rule."""
+        labels, edges = ["A", "B", "C"], [(0, 1)]
+        validate_plan(labels, edges, [["A", "C"], ["B"]])
+        for plan in (
+            [["A", "B"], ["C"]],
+            [["A"], [], ["B", "C"]],
+            [["A"], ["B"]],
+            [["A", "C"], ["B", "C"]],
+            [["A", "C"], ["B", "D"]],
+            [["A", "B", "C", "D", "E"]],
+        ):
+            with self.assertRaises(ValueError):
+                validate_plan(labels, edges, plan)
+
+    def test_properties_2(self):
+        """Test many small catalogs."""
+        for num_vertices in (1, 2, 5, 20, 100):
+            self.check_catalogs(num_vertices, 40, seed=num_vertices)
+
+    def test_properties_3(self):
+        """Test large catalogs against the time budget."""
+        for num_vertices, count in ((1000, 10), (10000, 3), (100000, 1)):
+            start = time.perf_counter()
+            self.check_catalogs(num_vertices, count, seed=num_vertices)
+            self.assertLess(
+                time.perf_counter() - start, PROPERTY_BUDGET_SECONDS[num_vertices]
+            )
+
+
+class TestStartup(unittest.TestCase):
+    """Command line startup Test Suite"""
+
+    def run_python(self, *args, stdin=None):
+        """Run a fresh interpreter in this directory with bytecode caching on."""
+        environment = dict(os.environ)
+        environment.pop("PYTHONDONTWRITEBYTECODE", None)
+        return subprocess.run(
+            [sys.executable, *args],
+            cwd=HERE,
+            env=environment,
+            stdin=stdin,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def test_startup_1(self):
+        """Test that planning from the command line only imports the core."""
+        script = (
+            "import sys\n"
+            "before = set(sys.modules)\n"
+            "import registration\n"
+            "registration.main()\n"
+            "sys.stderr.write(' '.join(sorted(set(sys.modules) - before)))\n"
+        )
+        with open(os.path.join(HERE, "registration.in"), encoding="utf-8") as catalog:
+            result = self.run_python("-c", script, stdin=catalog)
+        self.assertTrue(result.stdout.startswith("Valid registration plan detected."))
+        self.assertLessEqual(set(result.stderr.split()), CORE_MODULES)
+
+    def test_startup_2(self):
+        """Test the import time of registration against the startup budget."""
+        # the first run may have to write the bytecode cache
+        for _ in range(2):
+            result = self.run_python("-X", "importtime", "-c", "import registration")
+        line = result.stderr.strip().splitlines()[-1]
+        _, _, cumulative, name = (part.strip() for part in line.replace(":", "|").split("|"))
+        self.assertEqual(name, "registration")
+        self.assertLess(int(cumulative), STARTUP_BUDGET_MICROSECONDS)
+
+
+class TestBenchmark(unittest.TestCase):
+    """Benchmark harness Test Suite"""
+
+    def test_benchmark_1(self):
+        """Test that every synthetic shape plans validly and regressions are flagged."""
+        results = benchmark_registration.run(
+            benchmark_registration.SHAPES, [30, 120], seed=3
+        )
+        self.assertEqual(results["chain"]["120"]["semesters"], 120)
+        baseline = json.loads(json.dumps(results))
+        baseline["random"]["120"]["plan"] = 0.01
+        results["random"]["120"]["plan"] = 1.0
+        regressions = benchmark_registration.compare(results, baseline, 1.5)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("random n=120 plan"))
+        self.assertEqual(benchmark_registration.compare(results, results, 1.5), [])
+
+    def test_benchmark_2(self):
+        """Test that the container micro-benchmark times every container."""
+        results = benchmark_registration.run_containers(100)
+        self.assertEqual(len(results), 6)
+        self.assertIn("ArrayQueue extend/drain", results)
+
+    def test_benchmark_3(self):
+        """Test that every synthetic shape handles the smallest catalogs."""
+        results = benchmark_registration.run(benchmark_registration.SHAPES, [1, 2, 3])
+        self.assertEqual(results["random"]["2"]["edges"], 1)
+        self.assertEqual(results["random"]["3"]["edges"], 3)
+        self.assertEqual(results["chain"]["3"]["semesters"], 3)
+
 
 def main():
     """Main function to run tests based on command-line arguments."""
@@ -179,7 +1206,7 @@ def main():
         "Valid options for [test_method_or_function]: "
         + ", ".join(test_cases.keys())
         + "\n"
-        "Test cases range 1-6 for get_registration_plan(), and 1-3 for has_cycle()."
+        "Test cases range 1-12 for get_registration_plan(), and 1-5 for has_cycle()."
     )
 
     if len(sys.argv) > 3: